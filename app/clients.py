@@ -0,0 +1,36 @@
+"""Shared API clients for Sparky scripts and services.
+
+Each client is created on first use and reused for the rest of the process, so
+repeated searches and health probes share one connection pool instead of paying
+for a new TLS handshake every time.
+"""
+
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI
+from supabase import create_client, Client
+
+from .config import config
+
+# Connection pool limits for the shared OpenAI HTTP client
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 32
+
+
+@lru_cache(maxsize=1)
+def get_openai() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client backed by a keep-alive pool."""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+        )
+    )
+    return AsyncOpenAI(api_key=config.openai_api_key, http_client=http_client)
+
+
+@lru_cache(maxsize=1)
+def get_supabase() -> Client:
+    """Return the process-wide Supabase client."""
+    return create_client(config.supabase_url, config.supabase_key)
@@ -9,10 +9,13 @@ import sys
 from datetime import datetime
 from typing import List, Dict, Any
 
-from openai import AsyncOpenAI
 from supabase import create_client, Client
 from config import config
-from utils import get_embedding
+from app.clients import get_openai
+from utils import get_embedding, rerank_memories
+
+# Candidates fetched per requested memory, so reranking can promote rows below the top `limit`
+RERANK_CANDIDATE_FACTOR = 4
 
 
 class MemoryChat:
@@ -20,9 +23,16 @@ class MemoryChat:
 
     def __init__(self):
         """Initialize clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
+        self.openai_client = get_openai()
         self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
-        self.conversation_history = []
+        # Slot 0 is reserved for the per-turn system prompt; history follows it
+        self.messages: List[Dict[str, str]] = [{"role": "system", "content": ""}]
+        # Formatted memory context keyed by (memory id, displayed relevance) tuples
+        self._context_cache: Dict[tuple, str] = {}
+        self._context_cache_size = 64
+        # Cheap model for routing decisions, full model for the final reply
+        self._fast_model = "gpt-4o-mini"
+        self._smart_model = "gpt-4o"
 
     async def retrieve_relevant_memories(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Retrieve relevant memories for context."""
@@ -30,23 +40,48 @@ class MemoryChat:
             # Generate embedding for the query
             query_embedding = await get_embedding(query, self.openai_client)
             
-            # Search using Supabase RPC function
+            # Search using Supabase RPC function, then rerank the wider candidate set
             result = self.supabase.rpc('match_memories', {
                 'query_embedding': query_embedding,
-                'match_count': limit
+                'match_count': limit * RERANK_CANDIDATE_FACTOR
             }).execute()
             
-            return result.data if result.data else []
+            return rerank_memories(result.data, limit) if result.data else []
             
         except Exception as e:
             print(f"⚠️  Memory retrieval error: {e}")
             return []
 
+    async def should_use_memory(self, user_message: str) -> bool:
+        """Ask the fast model whether a message needs memory retrieval."""
+        try:
+            response = await self.openai_client.chat.completions.create(
+                model=self._fast_model,
+                messages=[
+                    {"role": "system", "content": "Decide whether answering the user's message would benefit from memories of past conversations (personal details, ongoing projects, earlier discussions). Reply with exactly USE_MEMORY or SKIP."},
+                    {"role": "user", "content": user_message[:1000]}
+                ],
+                temperature=0,
+                max_tokens=5
+            )
+            decision = (response.choices[0].message.content or "").strip().upper()
+            return not decision.startswith("SKIP")
+        except Exception as e:
+            # Retrieval is the safe default if the router is unavailable
+            print(f"⚠️  Memory routing error: {e}")
+            return True
+
     def format_memories_for_context(self, memories: List[Dict[str, Any]]) -> str:
         """Format retrieved memories into context string."""
         if not memories:
             return ""
         
+        # Follow-up turns often retrieve the same memories; reuse the rendered text
+        key = tuple((m.get('id'), f"{m.get('similarity', 0):.2f}") for m in memories)
+        cacheable = all(memory_id is not None for memory_id, _ in key)
+        if cacheable and key in self._context_cache:
+            return self._context_cache[key]
+        
         context_parts = ["# Relevant memories from past conversations:\n"]
         
         for i, memory in enumerate(memories, 1):
@@ -62,13 +97,21 @@ class MemoryChat:
                 f"   {content[:500]}...\n"
             )
         
-        return "\n".join(context_parts)
+        context = "\n".join(context_parts)
+        if cacheable:
+            if len(self._context_cache) >= self._context_cache_size:
+                self._context_cache.pop(next(iter(self._context_cache)))
+            self._context_cache[key] = context
+        return context
 
     async def chat(self, user_message: str, use_memory: bool = True) -> str:
         """Send a message and get a response with memory context."""
         
         # Retrieve relevant memories
         memories = []
+        if use_memory and not await self.should_use_memory(user_message):
+            print("⏭️  Memory not needed for this message.")
+            use_memory = False
         if use_memory:
             print("🔍 Searching memories...", end=" ", flush=True)
             memories = await self.retrieve_relevant_memories(user_message, limit=5)
@@ -89,24 +132,19 @@ Use the provided memories to give contextual, personalized responses. Reference
             memory_context = self.format_memories_for_context(memories)
             system_prompt += f"\n\n{memory_context}"
         
-        # Add user message to conversation history
-        self.conversation_history.append({
+        # Refresh the system prompt in place and add the user message
+        self.messages[0] = {"role": "system", "content": system_prompt}
+        self.messages.append({
             "role": "user",
             "content": user_message
         })
         
-        # Build messages for API call
-        messages = [
-            {"role": "system", "content": system_prompt},
-            *self.conversation_history
-        ]
-        
         # Get response from OpenAI
         try:
             print("💭 Thinking...", end=" ", flush=True)
             response = await self.openai_client.chat.completions.create(
-                model="gpt-4o",  # or "gpt-4o-mini" for cheaper/faster
-                messages=messages,
+                model=self._smart_model,
+                messages=self.messages,
                 temperature=0.7,
                 max_tokens=2000
             )
@@ -114,7 +152,7 @@ Use the provided memories to give contextual, personalized responses. Reference
             assistant_message = response.choices[0].message.content
             
             # Add to conversation history
-            self.conversation_history.append({
+            self.messages.append({
                 "role": "assistant",
                 "content": assistant_message
             })
@@ -128,7 +166,7 @@ Use the provided memories to give contextual, personalized responses. Reference
 
     def clear_history(self):
         """Clear conversation history."""
-        self.conversation_history = []
+        del self.messages[1:]
         print("🗑️  Conversation history cleared.")
 
 
@@ -10,6 +10,8 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
 
 def load_progress(progress_file: Path) -> dict:
     """Load progress data from file."""
@@ -18,10 +20,20 @@ def load_progress(progress_file: Path) -> dict:
     
     try:
         with open(progress_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            progress_data = json.load(f)
     except Exception as e:
         print(f"❌ Error loading progress file: {e}")
         return {}
+    
+    # Conversations finished since the last snapshot are in the append-only log
+    log_file = progress_file.with_suffix('.log')
+    if log_file.exists():
+        processed = set(progress_data.get('processed_conversations', []))
+        with open(log_file, 'r', encoding='utf-8') as f:
+            processed.update(line[2:] for line in f.read().splitlines() if line.startswith('C '))
+        progress_data['processed_conversations'] = list(processed)
+    
+    return progress_data
 
 
 def print_progress_report(progress_data: dict) -> None:
@@ -80,6 +92,16 @@ def print_progress_report(progress_data: dict) -> None:
     print(f"\n{'='*60}")
 
 
+def format_duration(seconds: float) -> str:
+    """Format a duration in seconds as hours and minutes."""
+    seconds = int(seconds)
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    if hours > 0:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
 def estimate_remaining_time(progress_data: dict) -> None:
     """Estimate remaining processing time."""
     stats = progress_data.get('stats', {})
@@ -95,26 +117,30 @@ def estimate_remaining_time(progress_data: dict) -> None:
         print("🎉 Ingestion complete!")
         return
     
-    # Rough estimates based on typical processing rates
-    # These are conservative estimates
-    avg_messages_per_conv = 25  # From your analysis
-    seconds_per_message = 3     # Including API calls and delays
-    
-    estimated_messages = remaining_conversations * avg_messages_per_conv
-    estimated_seconds = estimated_messages * seconds_per_message
-    
-    hours = estimated_seconds // 3600
-    minutes = (estimated_seconds % 3600) // 60
-    
     print(f"⏱️  ESTIMATED REMAINING TIME:")
     print(f"📊 Remaining conversations: {remaining_conversations:,}")
-    print(f"📝 Estimated remaining messages: {estimated_messages:,}")
-    
-    if hours > 0:
-        print(f"⏰ Estimated time: ~{hours}h {minutes}m")
+
+    # Prefer measured per-conversation timings when the progress file has them
+    durations = stats.get('durations', [])
+    if durations:
+        arr = np.asarray(durations, dtype=np.float64)
+        p50, p90 = np.percentile(arr, [50, 90])
+        low = format_duration(p50 * remaining_conversations)
+        high = format_duration(p90 * remaining_conversations)
+        print(f"⏰ Estimated time: ~{low} (p50) to ~{high} (p90)")
+        print(f"📐 Based on {arr.size:,} timed conversations")
     else:
-        print(f"⏰ Estimated time: ~{minutes}m")
-    
+        # Rough estimates based on typical processing rates
+        # These are conservative estimates
+        avg_messages_per_conv = 25  # From your analysis
+        seconds_per_message = 3     # Including API calls and delays
+
+        estimated_messages = remaining_conversations * avg_messages_per_conv
+        estimated_seconds = estimated_messages * seconds_per_message
+
+        print(f"📝 Estimated remaining messages: {estimated_messages:,}")
+        print(f"⏰ Estimated time: ~{format_duration(estimated_seconds)}")
+
     print(f"💡 Note: This is a rough estimate. Actual time may vary based on:")
     print(f"   • API rate limits and response times")
     print(f"   • Message complexity and length")
@@ -11,6 +11,73 @@ from unittest.mock import AsyncMock, patch
 
 from watch_and_load import MemoryWatcher, MemoryFileHandler
 
+# Demo file contents, encoded once at import time
+DEMO_NOTES = """
+Demo Notes - AI Memory System
+
+This is a demonstration of the automated file processing system.
+The file watcher monitors the memory-drops folder and automatically
+processes new files as they are added.
+
+Key features:
+- Automatic file detection and processing
+- Support for .txt, .md, and .json files
+- Metadata support through .meta.json files
+- Intelligent chunking for large documents
+- Duplicate detection and change tracking
+""".strip().encode('utf-8')
+
+PROJECT_UPDATE = """
+# Project Update - Week 3
+
+## Completed Tasks
+- Implemented file watcher functionality
+- Added comprehensive test suite
+- Created deployment validation scripts
+- Documented security policies
+
+## Next Steps
+- Deploy to production environment
+- Monitor system performance
+- Gather user feedback
+- Plan next iteration
+
+This update demonstrates the system's ability to process
+structured markdown content with proper metadata.
+""".strip().encode('utf-8')
+
+PROJECT_UPDATE_METADATA = json.dumps({
+    "source": "project_management",
+    "tags": ["update", "progress", "team"],
+    "importance": 4
+}, indent=2).encode('utf-8')
+
+DEMO_NOTES_UPDATE = b"\n\nThis is an update to test change detection."
+
+FILTER_TEST_FILES = [
+    ("supported.md", b"Markdown file", True),
+    ("supported.txt", b"Text file", True),
+    ("supported.json", b'{"test": "JSON file"}', True),
+    ("unsupported.pdf", b"PDF content", False),
+    ("metadata.meta.json", b'{"source": "test"}', False)
+]
+
+EXISTING_FILES = [
+    ("existing1.md", b"# Existing Document 1\nThis was here before the watcher started."),
+    ("existing2.txt", b"Existing text document with some content."),
+    ("existing3.json", b'{"message": "Existing JSON data", "processed": false}')
+]
+
+
+def write_demo_file(path: Path, data: bytes, append: bool = False) -> None:
+    """Write pre-encoded bytes to a file with a single os.write call."""
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(path, flags, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
 
 class DemoMemoryLoader:
     """Mock memory loader for demonstration purposes."""
@@ -62,21 +129,7 @@ async def demo_file_processing():
         print("\n🔹 Demo 1: Processing a simple text file")
         
         simple_file = watch_folder / "demo_notes.txt"
-        with open(simple_file, 'w', encoding='utf-8') as f:
-            f.write("""
-Demo Notes - AI Memory System
-
-This is a demonstration of the automated file processing system.
-The file watcher monitors the memory-drops folder and automatically
-processes new files as they are added.
-
-Key features:
-- Automatic file detection and processing
-- Support for .txt, .md, and .json files
-- Metadata support through .meta.json files
-- Intelligent chunking for large documents
-- Duplicate detection and change tracking
-            """.strip())
+        write_demo_file(simple_file, DEMO_NOTES)
         
         # Process the file
         result = await handler.process_file_async(simple_file)
@@ -86,36 +139,11 @@ Key features:
         print("\n🔹 Demo 2: Processing a file with metadata")
         
         markdown_file = watch_folder / "project_update.md"
-        with open(markdown_file, 'w', encoding='utf-8') as f:
-            f.write("""
-# Project Update - Week 3
-
-## Completed Tasks
-- Implemented file watcher functionality
-- Added comprehensive test suite
-- Created deployment validation scripts
-- Documented security policies
-
-## Next Steps
-- Deploy to production environment
-- Monitor system performance
-- Gather user feedback
-- Plan next iteration
-
-This update demonstrates the system's ability to process
-structured markdown content with proper metadata.
-            """.strip())
+        write_demo_file(markdown_file, PROJECT_UPDATE)
         
         # Create metadata file
         meta_file = markdown_file.with_suffix('.md.meta.json')
-        metadata = {
-            "source": "project_management",
-            "tags": ["update", "progress", "team"],
-            "importance": 4
-        }
-        
-        with open(meta_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2)
+        write_demo_file(meta_file, PROJECT_UPDATE_METADATA)
         
         # Process the file with metadata
         result = await handler.process_file_async(markdown_file)
@@ -141,8 +169,7 @@ structured markdown content with proper metadata.
         print("\n🔹 Demo 4: Change detection")
         
         # Modify the simple file
-        with open(simple_file, 'a', encoding='utf-8') as f:
-            f.write("\n\nThis is an update to test change detection.")
+        write_demo_file(simple_file, DEMO_NOTES_UPDATE, append=True)
         
         print("   📝 Modified existing file")
         
@@ -157,18 +184,9 @@ structured markdown content with proper metadata.
         # Demo 5: File type filtering
         print("\n🔹 Demo 5: File type filtering")
         
-        test_files = [
-            ("supported.md", "Markdown file", True),
-            ("supported.txt", "Text file", True),
-            ("supported.json", '{"test": "JSON file"}', True),
-            ("unsupported.pdf", "PDF content", False),
-            ("metadata.meta.json", '{"source": "test"}', False)
-        ]
-        
-        for filename, content, should_process in test_files:
+        for filename, content, should_process in FILTER_TEST_FILES:
             test_file = watch_folder / filename
-            with open(test_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            write_demo_file(test_file, content)
             
             will_process = handler.should_process_file(test_file)
             status = "✅" if will_process == should_process else "❌"
@@ -198,18 +216,10 @@ async def demo_watcher_startup():
         # Create watch folder with some existing files
         watch_folder.mkdir()
         
-        existing_files = [
-            ("existing1.md", "# Existing Document 1\nThis was here before the watcher started."),
-            ("existing2.txt", "Existing text document with some content."),
-            ("existing3.json", '{"message": "Existing JSON data", "processed": false}')
-        ]
-        
-        for filename, content in existing_files:
-            filepath = watch_folder / filename
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+        for filename, content in EXISTING_FILES:
+            write_demo_file(watch_folder / filename, content)
         
-        print(f"   📁 Created {len(existing_files)} existing files")
+        print(f"   📁 Created {len(EXISTING_FILES)} existing files")
         
         # Create watcher and replace loader with mock
         watcher = MemoryWatcher(str(watch_folder), str(processed_log))
@@ -1,24 +1,114 @@
 #!/usr/bin/env python3
 """
 Generate a password hash for the admin user.
-This script generates a hash for a default password.
+This script generates a hash for a default password, or for each password
+given with --password (repeatable) or read from stdin with --stdin (or
+--password -), one per line.
 """
 
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List
+
 import bcrypt
 
-def generate_hash_for_password(password: str) -> str:
+# Production hashes must use the default cost; lower values are for dev/CI fixtures only
+DEFAULT_ROUNDS = 12
+FAST_ROUNDS = 4
+# bcrypt.gensalt accepts cost factors in this range only
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+# argon2id parameters (argon2-cffi, optional): 2 passes over 64 MiB, single lane
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 64 * 1024
+ARGON2_PARALLELISM = 1
+
+def generate_argon2_hash(password: str) -> str:
+    """Generate an argon2id hash for the given password (requires argon2-cffi)."""
+    from argon2 import PasswordHasher
+    hasher = PasswordHasher(
+        time_cost=ARGON2_TIME_COST,
+        memory_cost=ARGON2_MEMORY_COST,
+        parallelism=ARGON2_PARALLELISM
+    )
+    return hasher.hash(password)
+
+def generate_hash_for_password(password: str, rounds: int = DEFAULT_ROUNDS) -> str:
     """Generate a bcrypt hash for the given password."""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds)
     password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
     return password_hash.decode('utf-8')
 
+def generate_hashes(passwords: List[str], rounds: int = DEFAULT_ROUNDS,
+                    use_argon2: bool = False) -> List[str]:
+    """Hash several passwords concurrently, returning hashes in input order."""
+    hash_one = generate_argon2_hash if use_argon2 else partial(generate_hash_for_password, rounds=rounds)
+    if len(passwords) == 1:
+        return [hash_one(passwords[0])]
+    # bcrypt and argon2 both release the GIL while hashing, so threads use separate cores
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(hash_one, passwords))
+
+def bcrypt_rounds(value: str) -> int:
+    """argparse type for --rounds: an integer within bcrypt's cost range."""
+    try:
+        rounds = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if not MIN_ROUNDS <= rounds <= MAX_ROUNDS:
+        raise argparse.ArgumentTypeError(f"must be between {MIN_ROUNDS} and {MAX_ROUNDS}, got {rounds}")
+    return rounds
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Generate a bcrypt hash for the admin password')
+    parser.add_argument('--rounds', type=bcrypt_rounds, default=DEFAULT_ROUNDS,
+                       help=f'bcrypt cost factor (default: {DEFAULT_ROUNDS}; keep this for production)')
+    parser.add_argument('--fast', action='store_true',
+                       help=f'Use cost factor {FAST_ROUNDS} for dev/CI fixtures (NOT for production)')
+    parser.add_argument('--argon2', action='store_true',
+                       help='Emit an argon2id hash instead of bcrypt (pip install argon2-cffi)')
+    parser.add_argument('--password', action='append', dest='passwords', default=[],
+                       help='Password to hash (repeatable); "-" reads passwords from stdin')
+    parser.add_argument('--stdin', action='store_true',
+                       help='Read passwords from stdin, one per line')
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_arguments()
+    rounds = FAST_ROUNDS if args.fast else args.rounds
+
+    if args.argon2:
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            print("❌ --argon2 requires argon2-cffi: pip install argon2-cffi")
+            sys.exit(1)
+
+    passwords = [password for password in args.passwords if password != '-']
+    if args.stdin or '-' in args.passwords:
+        passwords.extend(line.rstrip('\r\n') for line in sys.stdin if line.strip())
+
+    if len(passwords) > 1:
+        # Batch mode: one "password<TAB>hash" line per input, for fixtures
+        if rounds < DEFAULT_ROUNDS and not args.argon2:
+            print(f"⚠️  Cost factor {rounds} is for development fixtures only - do not use in production",
+                  file=sys.stderr)
+        for password, hash_result in zip(passwords, generate_hashes(passwords, rounds, args.argon2)):
+            print(f"{password}\t{hash_result}")
+        sys.exit(0)
+
     # Use a default secure password - you can change this
-    default_password = "sparky2024!"
-    hash_result = generate_hash_for_password(default_password)
-    
+    default_password = passwords[0] if passwords else "sparky2024!"
+    hash_result = generate_hashes([default_password], rounds, args.argon2)[0]
+
     print("Generated password hash for authentication:")
     print(f"Password: {default_password}")
     print(f"Hash: {hash_result}")
+    if rounds < DEFAULT_ROUNDS and not args.argon2:
+        print(f"⚠️  Cost factor {rounds} is for development fixtures only - do not use in production")
     print("\nAdd this to your .env file:")
     print(f'ADMIN_PASSWORD_HASH="{hash_result}"')
\ No newline at end of file
@@ -14,16 +14,91 @@ import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass
 
-from openai import AsyncOpenAI
+import numpy as np
+try:
+    import ijson
+except ImportError:  # fall back to loading the whole export with json
+    ijson = None
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
 from supabase import create_client, Client
 from config import config, parse_tags, validate_importance
-from utils import get_embedding
-
-
-@dataclass
+from app.clients import get_openai
+from utils import get_embeddings
+
+# Maximum rows per PostgREST bulk insert request
+INSERT_BATCH = 200
+
+# Embedding request limits: inputs per call, and a character budget that keeps
+# a request well under the endpoint's per-request token cap
+EMBED_BATCH = 128
+EMBED_BATCH_CHARS = 400_000
+
+# Conversations appended to the progress log between JSON snapshot rewrites
+PROGRESS_COMPACT_EVERY = 100
+
+# Preconfigured 64-bit BLAKE2b state; copying it is cheaper than building a new hasher
+_CONTENT_HASHER = hashlib.blake2b(digest_size=8)
+
+# Embedding requests in flight per conversation, and rows buffered for the inserter
+MAX_CONCURRENT_EMBEDS = 4
+ROW_QUEUE_SIZE = 2 * INSERT_BATCH
+
+# Keyword sets for importance scoring and tagging, matched against whole words
+HIGH_IMPORTANCE_KEYWORDS = frozenset({
+    'error', 'problem', 'issue', 'bug', 'fix', 'solution',
+    'important', 'critical', 'urgent', 'help', 'stuck'
+})
+TECHNICAL_KEYWORDS = frozenset({
+    'code', 'function', 'class', 'api', 'database', 'server',
+    'algorithm', 'implementation', 'architecture', 'design'
+})
+LEARNING_KEYWORDS = frozenset({
+    'learn', 'understand', 'explain', 'how', 'why', 'what',
+    'tutorial', 'guide', 'example', 'documentation'
+})
+TECH_TAG_KEYWORDS = {
+    'python': frozenset({'python', 'py', 'pip', 'django', 'flask'}),
+    'javascript': frozenset({'javascript', 'js', 'node', 'npm', 'react'}),
+    'web': frozenset({'html', 'css', 'website', 'browser', 'frontend'}),
+    'database': frozenset({'database', 'sql', 'supabase', 'postgres'}),
+    'ai': frozenset({'ai', 'gpt', 'openai', 'model', 'embedding', 'llm'}),
+    'coding': frozenset({'code', 'function', 'class', 'variable', 'algorithm'})
+}
+PROJECT_KEYWORDS = frozenset({'stellarus', 'innovation', 'engineer'})
+EDUCATION_KEYWORDS = frozenset({'gwc', 'students'})
+TROUBLESHOOTING_KEYWORDS = frozenset({'error', 'problem'})
+TUTORIAL_KEYWORDS = frozenset({'tutorial', 'guide'})
+
+_WORD_RE = re.compile(r"[a-z]+")
+# Multi-word keywords can't be matched as tokens, so each gets one compiled pattern
+_EDUCATION_PHRASE_RE = re.compile(r"\bgirls\s+who\s+code\b")
+_TUTORIAL_PHRASE_RE = re.compile(r"\bhow\s+to\b")
+
+
+def load_json(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when it is installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dump_json(obj: Any) -> bytes:
+    """Serialize obj as compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def tokenize(lowered: str) -> Set[str]:
+    """Return the set of words in already-lowercased text."""
+    return set(_WORD_RE.findall(lowered))
+
+
+@dataclass(slots=True)
 class ConversationMessage:
     """Structured representation of a conversation message."""
     id: str
@@ -34,47 +109,77 @@ class ConversationMessage:
     conversation_title: str
     parent_id: Optional[str] = None
     metadata: Optional[Dict] = None
+    content_hash: Optional[int] = None
 
 
 class SparkyExportProcessor:
     """Processes Sparky/ChatGPT export data for memory ingestion."""
 
-    def __init__(self, progress_file: Optional[Path] = None):
+    def __init__(self, progress_file: Optional[Path] = None, verbose: bool = False):
         """Initialize the processor with API clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
+        # Per-message and per-request detail is only printed in verbose mode
+        self.verbose = verbose
+        self.openai_client = get_openai()
         self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
 
         # Progress tracking
         self.progress_file = progress_file or Path('sparky_ingestion_progress.json')
         self.processed_conversations = set()
-        self.processed_messages = set()
+        self.processed_messages: Set[int] = set()
+        # Hashes of messages that failed every retry, kept for reporting
+        self.failed_messages: Set[int] = set()
+        self.conversation_durations: List[float] = []
+        # Append-only log of ids processed since the last JSON snapshot
+        self.progress_log_file = self.progress_file.with_suffix('.log')
+        self._progress_log = None
+        self._uncompacted_conversations = 0
         self.load_progress()
 
+        # Embeddings of messages whose insert failed, keyed by content hash
+        self.embedding_cache_file = self.progress_file.with_name(f"{self.progress_file.stem}_embeddings.npz")
+        self.embedding_cache: Dict[int, List[float]] = {}
+        self.load_embedding_cache()
+
         # Processing statistics
         self.total_conversations = 0
         self.total_messages = 0
         self.current_processed_messages = 0
         self.current_skipped_messages = 0
         self.current_failed_inserts = 0
+        # Set when the export could not be read to the end
+        self.export_truncated = False
 
         # Content filters
         self.skip_roles = {'system'}  # Skip system messages by default
         self.skip_content_types = {'user_editable_context', 'thoughts', 'reasoning_recap'}
         self.min_content_length = 10  # Skip very short messages
 
-    def generate_content_hash(self, content: str) -> str:
-        """Generate a hash for content to detect duplicates."""
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+    def debug(self, text: str) -> None:
+        """Print a detail line when running in verbose mode."""
+        if self.verbose:
+            print(text)
+
+    def generate_content_hash(self, content: str) -> int:
+        """Generate a 64-bit hash for content to detect duplicates."""
+        hasher = _CONTENT_HASHER.copy()
+        hasher.update(content.encode('utf-8'))
+        return int.from_bytes(hasher.digest(), 'big')
 
     def load_progress(self) -> None:
         """Load progress from previous runs."""
         if self.progress_file.exists():
             try:
-                with open(self.progress_file, 'r', encoding='utf-8') as f:
-                    progress_data = json.load(f)
+                progress_data = load_json(self.progress_file.read_bytes())
 
                 self.processed_conversations = set(progress_data.get('processed_conversations', []))
-                self.processed_messages = set(progress_data.get('processed_messages', []))
+                # Hashes are 64-bit ints; hex strings come from older md5-based progress files
+                message_hashes = progress_data.get('processed_messages', [])
+                self.processed_messages = {h for h in message_hashes if isinstance(h, int)}
+                if len(self.processed_messages) < len(message_hashes):
+                    print("⚠️  Ignoring message hashes from an older progress format; "
+                          "processed conversations are still skipped")
+                self.failed_messages = set(progress_data.get('failed_messages', [])) - self.processed_messages
+                self.conversation_durations = progress_data.get('stats', {}).get('durations', [])
 
                 print(f"📋 Loaded progress: {len(self.processed_conversations)} conversations, "
                       f"{len(self.processed_messages)} messages already processed")
@@ -83,15 +188,82 @@ class SparkyExportProcessor:
                 print(f"⚠️  Could not load progress file: {e}")
                 self.processed_conversations = set()
                 self.processed_messages = set()
-        else:
+                self.failed_messages = set()
+                self.conversation_durations = []
+        elif not self.progress_log_file.exists():
             print("🆕 Starting fresh ingestion (no progress file found)")
 
-    def save_progress(self) -> None:
-        """Save current progress to file."""
+        self.replay_progress_log()
+
+    def load_embedding_cache(self) -> None:
+        """Load embeddings cached by a previous run."""
+        try:
+            with np.load(self.embedding_cache_file) as cache:
+                hashes, vectors = cache['hashes'], cache['vectors']
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️  Could not load embedding cache: {e}")
+            return
+
+        self.embedding_cache = {int(h): vector.tolist() for h, vector in zip(hashes, vectors)}
+        print(f"📋 Loaded {len(self.embedding_cache)} cached embeddings")
+
+    def save_embedding_cache(self) -> None:
+        """Save cached embeddings, or remove the cache file when there are none."""
+        try:
+            if not self.embedding_cache:
+                self.embedding_cache_file.unlink(missing_ok=True)
+                return
+
+            hashes = np.fromiter(self.embedding_cache.keys(), dtype=np.uint64, count=len(self.embedding_cache))
+            vectors = np.asarray(list(self.embedding_cache.values()), dtype=np.float32)
+            np.savez(self.embedding_cache_file, hashes=hashes, vectors=vectors)
+
+        except Exception as e:
+            print(f"⚠️  Could not save embedding cache: {e}")
+
+    def replay_progress_log(self) -> None:
+        """Apply records appended to the progress log since the last snapshot."""
+        try:
+            with open(self.progress_log_file, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️  Could not read progress log: {e}")
+            return
+
+        for line in lines:
+            kind, _, value = line.partition(' ')
+            if kind == 'C':
+                self.processed_conversations.add(value)
+            elif kind == 'M' and value.isdigit():
+                self.processed_messages.add(int(value))
+
+        print(f"📋 Replayed {len(lines)} records from {self.progress_log_file}")
+
+    def append_progress(self, record: str) -> None:
+        """Append one record to the progress log."""
+        try:
+            if self._progress_log is None:
+                self._progress_log = open(self.progress_log_file, 'a', encoding='utf-8')
+            self._progress_log.write(record + '\n')
+        except Exception as e:
+            print(f"⚠️  Could not append to progress log: {e}")
+
+    def flush_progress(self) -> None:
+        """Flush appended progress records to disk."""
+        if self._progress_log is not None:
+            self._progress_log.flush()
+
+    def compact_progress(self) -> None:
+        """Rewrite the JSON progress snapshot and drop the replayed log."""
         try:
             progress_data = {
                 'processed_conversations': list(self.processed_conversations),
                 'processed_messages': list(self.processed_messages),
+                'failed_messages': list(self.failed_messages - self.processed_messages),
                 'last_updated': datetime.now().isoformat(),
                 'stats': {
                     'total_conversations': self.total_conversations,
@@ -99,12 +271,23 @@ class SparkyExportProcessor:
                     'processed_messages': len(self.processed_messages),
                     'current_session_processed': self.current_processed_messages,
                     'current_session_skipped': self.current_skipped_messages,
-                    'current_session_failed': self.current_failed_inserts
+                    'current_session_failed': self.current_failed_inserts,
+                    'failed_messages': len(self.failed_messages - self.processed_messages),
+                    'durations': self.conversation_durations
                 }
             }
 
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(progress_data, f, indent=2)
+            # Write beside the snapshot and swap it in, so a crash never leaves a torn file
+            tmp_file = self.progress_file.with_suffix('.tmp')
+            tmp_file.write_bytes(dump_json(progress_data))
+            os.replace(tmp_file, self.progress_file)
+
+            # Everything in the log is now in the snapshot
+            if self._progress_log is not None:
+                self._progress_log.close()
+                self._progress_log = None
+            self.progress_log_file.unlink(missing_ok=True)
+            self._uncompacted_conversations = 0
 
         except Exception as e:
             print(f"⚠️  Could not save progress: {e}")
@@ -113,50 +296,62 @@ class SparkyExportProcessor:
         """Check if a conversation has already been processed."""
         return conversation_id in self.processed_conversations
 
-    def is_message_processed(self, message_hash: str) -> bool:
+    def is_message_processed(self, message_hash: int) -> bool:
         """Check if a message has already been processed."""
         return message_hash in self.processed_messages
 
     def mark_conversation_processed(self, conversation_id: str) -> None:
         """Mark a conversation as processed."""
         self.processed_conversations.add(conversation_id)
-        self.save_progress()
+        self.append_progress(f"C {conversation_id}")
+        self.flush_progress()
+
+        # Periodically fold the log into the snapshot so progress checks stay current
+        self._uncompacted_conversations += 1
+        if self._uncompacted_conversations >= PROGRESS_COMPACT_EVERY:
+            self.compact_progress()
 
-    def mark_message_processed(self, message_hash: str) -> None:
+    def mark_message_processed(self, message_hash: int) -> None:
         """Mark a message as processed."""
         self.processed_messages.add(message_hash)
+        self.append_progress(f"M {message_hash}")
 
-    def load_conversations(self, conversations_file: Path) -> List[Dict]:
-        """Load conversations from the JSON export file."""
+    def iter_conversations(self, conversations_file: Path) -> Iterator[Dict]:
+        """Stream conversations from the JSON export file one at a time."""
         try:
-            with open(conversations_file, 'r', encoding='utf-8') as f:
-                conversations = json.load(f)
-            print(f"📚 Loaded {len(conversations)} conversations from {conversations_file}")
-            return conversations
+            with open(conversations_file, 'rb') as f:
+                if ijson is None:
+                    yield from load_json(f.read())
+                else:
+                    # use_float keeps create_time JSON-serializable (ijson defaults to Decimal)
+                    yield from ijson.items(f, 'item', use_float=True)
         except Exception as e:
+            # Conversations already yielded are kept; the summary and exit code report the rest
+            self.export_truncated = True
             print(f"❌ Error loading conversations: {e}")
-            return []
     
     def extract_messages_from_conversation(self, conversation: Dict) -> List[ConversationMessage]:
-        """Extract meaningful messages from a conversation tree."""
+        """Extract meaningful messages from a conversation tree, skipping ones already stored."""
         messages = []
+        seen_hashes: Set[int] = set()
         mapping = conversation.get('mapping', {})
         title = conversation.get('title', 'Untitled Conversation')
         conv_id = conversation.get('conversation_id', 'unknown')
         
-        for node_id, node in mapping.items():
+        for node in mapping.values():
             message_data = node.get('message')
             if not message_data:
                 continue
                 
-            # Extract basic message info
-            author = message_data.get('author', {})
-            role = author.get('role', 'unknown')
+            # Skip unwanted roles before touching the content
+            role = message_data.get('author', {}).get('role', 'unknown')
+            if role in self.skip_roles:
+                continue
+            
+            # Skip unwanted content types
             content_data = message_data.get('content', {})
             content_type = content_data.get('content_type', 'text')
-            
-            # Skip unwanted content types and roles
-            if role in self.skip_roles or content_type in self.skip_content_types:
+            if content_type in self.skip_content_types:
                 continue
                 
             # Extract text content
@@ -171,10 +366,18 @@ class SparkyExportProcessor:
             # Skip empty or very short content
             if len(content) < self.min_content_length:
                 continue
+            self.total_messages += 1
+            
+            # Deduplicate before building the message object
+            content_hash = self.generate_content_hash(content)
+            if self.is_message_processed(content_hash) or content_hash in seen_hashes:
+                self.current_skipped_messages += 1
+                continue
+            seen_hashes.add(content_hash)
                 
             # Create message object
             message = ConversationMessage(
-                id=message_data.get('id', node_id),
+                id=message_data.get('id') or node.get('id'),
                 role=role,
                 content=content,
                 create_time=message_data.get('create_time'),
@@ -186,132 +389,102 @@ class SparkyExportProcessor:
                     'status': message_data.get('status'),
                     'model_slug': message_data.get('metadata', {}).get('model_slug'),
                     'request_id': message_data.get('metadata', {}).get('request_id')
-                }
+                },
+                content_hash=content_hash
             )
             
             messages.append(message)
             
         return messages
     
-    def determine_message_importance(self, message: ConversationMessage) -> int:
-        """Determine importance level (1-5) based on message content and context."""
-        content = message.content.lower()
-        
-        # High importance indicators
-        if any(keyword in content for keyword in [
-            'error', 'problem', 'issue', 'bug', 'fix', 'solution',
-            'important', 'critical', 'urgent', 'help', 'stuck'
-        ]):
-            return 4
-            
-        # Medium-high importance for technical content
-        if any(keyword in content for keyword in [
-            'code', 'function', 'class', 'api', 'database', 'server',
-            'algorithm', 'implementation', 'architecture', 'design'
-        ]):
-            return 3
-            
-        # Medium importance for learning/discussion
-        if any(keyword in content for keyword in [
-            'learn', 'understand', 'explain', 'how', 'why', 'what',
-            'tutorial', 'guide', 'example', 'documentation'
-        ]):
-            return 3
-            
-        # Lower importance for casual conversation
-        if len(message.content) < 50:
-            return 1
-            
-        return 2  # Default importance
-    
-    def generate_message_tags(self, message: ConversationMessage) -> List[str]:
-        """Generate relevant tags for a message based on content and context."""
+    def classify_message(self, message: ConversationMessage,
+                         lowered: Optional[str] = None) -> Tuple[List[str], int]:
+        """Derive tags and importance (1-5) from a single pass over the message content.
+
+        Pass lowered (message.content.lower()) if the caller already has it.
+        """
+        content = message.content.lower() if lowered is None else lowered
+        tokens = tokenize(content)
+
         tags = ['sparky-export', 'chat-history']
-        content = message.content.lower()
-        
+
         # Add role-based tag
         tags.append(f"role-{message.role}")
-        
+
         # Technical tags
-        tech_keywords = {
-            'python': ['python', 'py', 'pip', 'django', 'flask'],
-            'javascript': ['javascript', 'js', 'node', 'npm', 'react'],
-            'web': ['html', 'css', 'website', 'browser', 'frontend'],
-            'database': ['database', 'sql', 'supabase', 'postgres'],
-            'ai': ['ai', 'gpt', 'openai', 'model', 'embedding', 'llm'],
-            'coding': ['code', 'function', 'class', 'variable', 'algorithm']
-        }
-        
-        for tag, keywords in tech_keywords.items():
-            if any(keyword in content for keyword in keywords):
+        for tag, keywords in TECH_TAG_KEYWORDS.items():
+            if tokens & keywords:
                 tags.append(tag)
-        
+
         # Project-specific tags
-        if any(keyword in content for keyword in ['stellarus', 'innovation', 'engineer']):
+        if tokens & PROJECT_KEYWORDS:
             tags.append('stellarus')
-            
-        if any(keyword in content for keyword in ['girls who code', 'gwc', 'students']):
+
+        if tokens & EDUCATION_KEYWORDS or _EDUCATION_PHRASE_RE.search(content):
             tags.append('education')
-            
+
         # Conversation context
-        if 'error' in content or 'problem' in content:
+        if tokens & TROUBLESHOOTING_KEYWORDS:
             tags.append('troubleshooting')
-            
-        if any(keyword in content for keyword in ['tutorial', 'guide', 'how to']):
+
+        if tokens & TUTORIAL_KEYWORDS or _TUTORIAL_PHRASE_RE.search(content):
             tags.append('tutorial')
-            
-        return tags
 
-    async def store_message_with_retry(self, message: ConversationMessage,
-                                     tags: List[str], importance: int,
-                                     max_retries: int = 3) -> bool:
-        """Store a message in the database with retry logic."""
-        # Generate content hash for deduplication
-        content_hash = self.generate_content_hash(message.content)
+        # High importance indicators
+        if tokens & HIGH_IMPORTANCE_KEYWORDS:
+            importance = 4
+        # Medium-high importance for technical content, medium for learning/discussion
+        elif tokens & TECHNICAL_KEYWORDS or tokens & LEARNING_KEYWORDS:
+            importance = 3
+        # Lower importance for casual conversation
+        elif len(message.content) < 50:
+            importance = 1
+        else:
+            importance = 2  # Default importance
 
-        # Check if already processed
-        if self.is_message_processed(content_hash):
-            print(f"  ⏭️  Message already processed, skipping")
-            return True
+        return tags, importance
 
-        for attempt in range(max_retries):
-            try:
-                # Generate embedding
-                print(f"      🔄 Generating embedding...")
-                embedding = await get_embedding(message.content, self.openai_client)
-                print(f"      ✅ Embedding generated ({len(embedding)} dimensions)")
-
-                # Prepare data for insertion
-                data = {
-                    "content": message.content,
-                    "embedding": embedding,
-                    "type": "chat",
-                    "source": "sparky-export",
-                    "importance": importance,
-                    "tags": tags,
-                    "metadata": {
-                        "conversation_id": message.conversation_id,
-                        "conversation_title": message.conversation_title,
-                        "message_id": message.id,
-                        "role": message.role,
-                        "create_time": message.create_time,
-                        "parent_id": message.parent_id,
-                        "content_hash": content_hash,
-                        **message.metadata
-                    }
-                }
+    def determine_message_importance(self, message: ConversationMessage,
+                                     lowered: Optional[str] = None) -> int:
+        """Determine importance level (1-5) based on message content and context."""
+        return self.classify_message(message, lowered)[1]
 
-                # Insert into database
-                print(f"      💾 Inserting into database...")
-                result = self.supabase.table(config.memory_table).insert(data).execute()
+    def generate_message_tags(self, message: ConversationMessage,
+                              lowered: Optional[str] = None) -> List[str]:
+        """Generate relevant tags for a message based on content and context."""
+        return self.classify_message(message, lowered)[0]
+
+    def build_memory_row(self, message: ConversationMessage, embedding: List[float],
+                         tags: List[str], importance: int) -> Dict[str, Any]:
+        """Build the structured_memory row for a message."""
+        return {
+            "content": message.content,
+            "embedding": embedding,
+            "type": "chat",
+            "source": "sparky-export",
+            "importance": importance,
+            "tags": tags,
+            "metadata": {
+                "conversation_id": message.conversation_id,
+                "conversation_title": message.conversation_title,
+                "message_id": message.id,
+                "role": message.role,
+                "create_time": message.create_time,
+                "parent_id": message.parent_id,
+                "content_hash": message.content_hash,
+                **message.metadata
+            }
+        }
 
-                if result.data:
-                    # Mark as processed
-                    self.mark_message_processed(content_hash)
-                    print(f"      ✅ Successfully stored!")
-                    return True
-                else:
-                    raise RuntimeError("No data returned from insert")
+    async def embed_batch(self, messages: List[ConversationMessage],
+                          max_retries: int = 3) -> Optional[List[List[float]]]:
+        """Generate embeddings for a batch of messages in one request, with retry logic."""
+        for attempt in range(max_retries):
+            try:
+                self.debug(f"      🔄 Generating {len(messages)} embeddings...")
+                embeddings = await get_embeddings([m.content for m in messages], self.openai_client)
+                self.debug(f"      ✅ Embeddings generated ({len(embeddings[0])} dimensions)")
+                return embeddings
 
             except Exception as e:
                 error_msg = str(e)
@@ -324,13 +497,82 @@ class SparkyExportProcessor:
                     print(f"     ⏳ Waiting {wait_time}s before retry...")
                     await asyncio.sleep(wait_time)
                 else:
-                    print(f"\n  🛑 FAILED after {max_retries} attempts")
-                    print(f"     Message content preview: {message.content[:100]}...")
+                    print(f"\n  🛑 FAILED to embed {len(messages)} messages after {max_retries} attempts")
+                    print(f"     First message preview: {messages[0].content[:100]}...")
                     print(f"     Pausing for 5 seconds so you can see this error...")
                     await asyncio.sleep(5)
-                    return False
 
-        return False
+        return None
+
+    @staticmethod
+    def split_embedding_batches(prepared: List[tuple]) -> Iterator[List[tuple]]:
+        """Group prepared messages into EMBED_BATCH-sized requests under EMBED_BATCH_CHARS."""
+        batch: List[tuple] = []
+        batch_chars = 0
+        for item in prepared:
+            size = len(item[0].content)
+            if batch and (len(batch) >= EMBED_BATCH or batch_chars + size > EMBED_BATCH_CHARS):
+                yield batch
+                batch, batch_chars = [], 0
+            batch.append(item)
+            batch_chars += size
+        if batch:
+            yield batch
+
+    async def persist_rows(self, rows: List[Dict[str, Any]], max_retries: int = 3) -> int:
+        """Bulk insert rows in INSERT_BATCH chunks with retry logic; return the number stored."""
+        stored = 0
+
+        for start in range(0, len(rows), INSERT_BATCH):
+            chunk = rows[start:start + INSERT_BATCH]
+
+            for attempt in range(max_retries):
+                try:
+                    # PostgREST turns a JSON array body into one multi-row INSERT
+                    self.debug(f"      💾 Inserting {len(chunk)} messages into database...")
+                    # Run the blocking client call in a thread so embedding continues meanwhile
+                    result = await asyncio.to_thread(
+                        self.supabase.table(config.memory_table).insert(chunk).execute
+                    )
+
+                    if not result.data:
+                        raise RuntimeError("No data returned from insert")
+
+                    # Only mark the rows the database actually returned
+                    inserted = {row.get('metadata', {}).get('content_hash') for row in result.data}
+                    for row in chunk:
+                        content_hash = row['metadata']['content_hash']
+                        if content_hash in inserted:
+                            self.mark_message_processed(content_hash)
+                            stored += 1
+                    self.flush_progress()
+                    self.debug(f"      ✅ Successfully stored {len(inserted)} messages!")
+                    break
+
+                except Exception as e:
+                    error_msg = str(e)
+                    print(f"\n  ❌ ERROR on attempt {attempt + 1}/{max_retries}:")
+                    print(f"     Error type: {type(e).__name__}")
+                    print(f"     Error message: {error_msg[:200]}")
+
+                    if attempt < max_retries - 1:
+                        wait_time = 2 ** attempt  # Exponential backoff
+                        print(f"     ⏳ Waiting {wait_time}s before retry...")
+                        await asyncio.sleep(wait_time)
+                    else:
+                        print(f"\n  🛑 FAILED to insert {len(chunk)} messages after {max_retries} attempts")
+                        print(f"     Pausing for 5 seconds so you can see this error...")
+                        await asyncio.sleep(5)
+
+            # Keep vectors for rows that didn't make it so a resume doesn't pay for them again
+            for row in chunk:
+                content_hash = row['metadata']['content_hash']
+                if content_hash in self.processed_messages:
+                    self.embedding_cache.pop(content_hash, None)
+                else:
+                    self.embedding_cache[content_hash] = row['embedding']
+
+        return stored
 
     async def process_conversation(self, conversation: Dict) -> None:
         """Process a single conversation and store its messages."""
@@ -343,67 +585,96 @@ class SparkyExportProcessor:
             return
 
         print(f"\n📖 Processing: '{title}' ({conv_id})")
+        start_time = time.time()
 
-        # Extract messages
+        # Extract messages not stored yet
         messages = self.extract_messages_from_conversation(conversation)
-        self.total_messages += len(messages)
 
         if not messages:
-            print("  ⚠️  No meaningful messages found, skipping")
-            self.current_skipped_messages += len(messages)
+            print("  ⚠️  No new meaningful messages found, skipping")
             # Still mark as processed to avoid re-checking
             self.mark_conversation_processed(conv_id)
             return
 
-        print(f"  📝 Found {len(messages)} meaningful messages")
+        print(f"  📝 Found {len(messages)} new meaningful messages")
 
-        # Process messages in batches
-        batch_size = 3  # Small batches to avoid rate limits
-        conversation_success = True
+        prepared = []
 
-        for i in range(0, len(messages), batch_size):
-            batch = messages[i:i + batch_size]
-            tasks = []
-
-            for j, message in enumerate(batch):
-                msg_num = i + j + 1
+        for msg_num, message in enumerate(messages, 1):
+            if self.verbose:
                 print(f"    💬 Processing message {msg_num}/{len(messages)} ({message.role})")
 
-                # Generate tags and importance
-                tags = self.generate_message_tags(message)
-                importance = self.determine_message_importance(message)
-
-                # Create storage task
-                task = self.store_message_with_retry(message, tags, importance)
-                tasks.append(task)
-
-            # Execute batch
-            if tasks:
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                for result in results:
-                    if isinstance(result, Exception):
-                        self.current_failed_inserts += 1
-                        conversation_success = False
-                    elif result:
-                        self.current_processed_messages += 1
-                    else:
-                        self.current_failed_inserts += 1
-                        conversation_success = False
-
-                # Save progress periodically (every batch)
-                if i % (batch_size * 5) == 0:  # Every 5 batches
-                    self.save_progress()
-
-                # Small delay between batches
-                await asyncio.sleep(1)
-
-        # Mark conversation as processed if successful
-        if conversation_success:
+            # Generate tags and importance
+            tags, importance = self.classify_message(message)
+
+            prepared.append((message, tags, importance))
+
+        # Embedders fill a bounded queue while one inserter drains it in bulk
+        row_queue: asyncio.Queue = asyncio.Queue(maxsize=ROW_QUEUE_SIZE)
+        embed_slots = asyncio.Semaphore(MAX_CONCURRENT_EMBEDS)
+
+        async def embedder(batch: List[tuple]) -> None:
+            async with embed_slots:
+                embeddings = await self.embed_batch([message for message, *_ in batch])
+            if embeddings is None:
+                # Counted as failures below via the stored/queued difference
+                return
+            for (message, tags, importance), embedding in zip(batch, embeddings):
+                await row_queue.put(self.build_memory_row(message, embedding, tags, importance))
+
+        async def reuse_cached(items: List[tuple]) -> None:
+            for message, tags, importance in items:
+                embedding = self.embedding_cache[message.content_hash]
+                await row_queue.put(self.build_memory_row(message, embedding, tags, importance))
+
+        async def inserter() -> int:
+            stored = 0
+            pending: List[Dict[str, Any]] = []
+            while (row := await row_queue.get()) is not None:
+                pending.append(row)
+                if len(pending) >= INSERT_BATCH:
+                    stored += await self.persist_rows(pending)
+                    pending = []
+            if pending:
+                stored += await self.persist_rows(pending)
+            return stored
+
+        # Messages embedded in an earlier run whose insert failed skip the API
+        cached = [item for item in prepared if item[0].content_hash in self.embedding_cache]
+        to_embed = [item for item in prepared if item[0].content_hash not in self.embedding_cache]
+
+        queued = len(prepared)
+        inserter_task = asyncio.create_task(inserter())
+        try:
+            # A failing producer cancels its siblings instead of leaving them running
+            async with asyncio.TaskGroup() as producers:
+                producers.create_task(reuse_cached(cached))
+                for batch in self.split_embedding_batches(to_embed):
+                    producers.create_task(embedder(batch))
+            await row_queue.put(None)
+            stored = await inserter_task
+        finally:
+            inserter_task.cancel()
+
+        self.current_processed_messages += stored
+        self.current_failed_inserts += queued - stored
+
+        # Track messages still missing after retries; the next run retries them
+        for message in messages:
+            if message.content_hash in self.processed_messages:
+                self.failed_messages.discard(message.content_hash)
+            else:
+                self.failed_messages.add(message.content_hash)
+
+        # Record wall-clock time for ETA estimates
+        self.conversation_durations.append(round(time.time() - start_time, 3))
+
+        # Mark conversation as processed if every message was stored
+        if stored == queued:
             self.mark_conversation_processed(conv_id)
-            print(f"  ✅ Conversation completed successfully")
+            print(f"  ✅ Conversation completed successfully ({stored} messages stored)")
         else:
-            print(f"  ⚠️  Conversation completed with some failures")
+            print(f"  ⚠️  Conversation completed with some failures ({stored}/{queued} messages stored)")
 
     async def process_export_folder(self, export_folder: Path) -> None:
         """Process the entire Sparky export folder."""
@@ -416,52 +687,57 @@ class SparkyExportProcessor:
         print(f"🚀 Processing Sparky export from: {export_folder}")
         print(f"📁 Progress file: {self.progress_file}")
 
-        # Load conversations
-        conversations = self.load_conversations(conversations_file)
-        if not conversations:
-            return
-
-        self.total_conversations = len(conversations)
-
-        # Filter out already processed conversations
-        remaining_conversations = [
-            conv for conv in conversations
-            if not self.is_conversation_processed(conv.get('conversation_id', 'unknown'))
-        ]
+        # Stream conversations so work starts before the whole export is parsed
+        self.total_conversations = 0
+        already_processed = 0
+        session_count = 0
 
-        if len(remaining_conversations) < len(conversations):
-            already_processed = len(conversations) - len(remaining_conversations)
-            print(f"📋 Resuming: {already_processed} conversations already processed, "
-                  f"{len(remaining_conversations)} remaining")
+        for conversation in self.iter_conversations(conversations_file):
+            self.total_conversations += 1
 
-        if not remaining_conversations:
-            print("✅ All conversations already processed!")
-            self.print_summary()
-            return
+            # Skip already processed conversations
+            if self.is_conversation_processed(conversation.get('conversation_id', 'unknown')):
+                already_processed += 1
+                continue
 
-        # Process each remaining conversation
-        for i, conversation in enumerate(remaining_conversations, 1):
-            total_progress = len(conversations) - len(remaining_conversations) + i
-            print(f"\n📊 Progress: {total_progress}/{len(conversations)} conversations "
-                  f"(Session: {i}/{len(remaining_conversations)})")
+            session_count += 1
+            print(f"\n📊 Progress: {len(self.processed_conversations)} conversations processed overall, "
+                  f"now #{self.total_conversations} in export (Session: {session_count})")
 
             try:
                 await self.process_conversation(conversation)
             except KeyboardInterrupt:
                 print(f"\n⏸️  Interrupted! Progress saved. Resume with the same command.")
-                self.save_progress()
+                self.compact_progress()
+                self.save_embedding_cache()
                 raise
             except Exception as e:
                 print(f"❌ Error processing conversation: {e}")
                 # Continue with next conversation
                 continue
 
-        # Final save and summary
-        self.save_progress()
+        if not self.total_conversations:
+            if self.export_truncated:
+                self.print_summary()
+            return
+
+        print(f"\n📚 Read {self.total_conversations} conversations from {conversations_file}")
+        if already_processed:
+            print(f"📋 Resumed: {already_processed} conversations were already processed")
+
+        if not session_count and not self.export_truncated:
+            print("✅ All conversations already processed!")
+            self.print_summary()
+            return
+
+        # Final summary (compacts progress)
         self.print_summary()
 
     def print_summary(self) -> None:
         """Print processing summary."""
+        self.compact_progress()
+        self.save_embedding_cache()
+
         print(f"\n{'='*70}")
         print(f"📊 SPARKY EXPORT PROCESSING SUMMARY")
         print(f"{'='*70}")
@@ -476,6 +752,8 @@ class SparkyExportProcessor:
         print(f"✅ Messages processed: {self.current_processed_messages}")
         print(f"⏭️  Messages skipped: {self.current_skipped_messages}")
         print(f"❌ Failed inserts: {self.current_failed_inserts}")
+        if self.failed_messages:
+            print(f"🔁 Messages pending retry on next run: {len(self.failed_messages)}")
 
         # Calculate rates
         total_current = (self.current_processed_messages +
@@ -488,7 +766,12 @@ class SparkyExportProcessor:
 
         # Progress information
         remaining_conversations = self.total_conversations - len(self.processed_conversations)
-        if remaining_conversations > 0:
+        if self.export_truncated:
+            print(f"\n⚠️  IMPORT TRUNCATED:")
+            print(f"📋 The export could not be read past conversation #{self.total_conversations}")
+            print(f"💾 Progress saved to: {self.progress_file}")
+            print(f"🔄 Fix or re-export conversations.json, then rerun the same command to resume")
+        elif remaining_conversations > 0:
             print(f"\n⏳ REMAINING WORK:")
             print(f"📋 Conversations remaining: {remaining_conversations}")
             print(f"💾 Progress saved to: {self.progress_file}")
@@ -524,6 +807,11 @@ async def main():
         action='store_true',
         help='Reset progress and start fresh (deletes progress file)'
     )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Print per-message and per-request progress'
+    )
 
     args = parser.parse_args()
 
@@ -539,11 +827,14 @@ async def main():
     try:
         # Handle reset option
         progress_file = args.progress_file or Path('sparky_ingestion_progress.json')
-        if args.reset and progress_file.exists():
-            progress_file.unlink()
-            print(f"🗑️  Deleted progress file: {progress_file}")
+        if args.reset:
+            for path in (progress_file, progress_file.with_suffix('.log'),
+                         progress_file.with_name(f"{progress_file.stem}_embeddings.npz")):
+                if path.exists():
+                    path.unlink()
+                    print(f"🗑️  Deleted progress file: {path}")
 
-        processor = SparkyExportProcessor(progress_file)
+        processor = SparkyExportProcessor(progress_file, verbose=args.verbose)
 
         if args.dry_run:
             print("🔍 DRY RUN MODE - No data will be stored")
@@ -556,6 +847,10 @@ async def main():
         processing_time = end_time - start_time
         print(f"⏱️  Session processing time: {processing_time:.2f} seconds")
 
+        if processor.export_truncated:
+            print(f"❌ Import truncated: conversations.json could not be read to the end")
+            sys.exit(1)
+
         if processor.current_failed_inserts > 0:
             print(f"⚠️  Session completed with {processor.current_failed_inserts} failures")
             sys.exit(1)
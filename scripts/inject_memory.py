@@ -3,15 +3,17 @@
 
 import argparse
 import asyncio
-import os
+import json
 import sys
+from pathlib import Path
 from typing import List, Optional
 
 # Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
 
-from openai import AsyncOpenAI
-from supabase import create_client, Client
+from supabase import Client
+from app.clients import get_openai, get_supabase
 from app.config import config, parse_tags, validate_importance
 from app.memory.utils import get_embedding
 
@@ -20,9 +22,9 @@ class MemoryInjector:
     """Handles memory injection with embedding generation."""
 
     def __init__(self) -> None:
-        """Initialize OpenAI and Supabase clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
+        """Attach the shared OpenAI and Supabase clients."""
+        self.openai_client = get_openai()
+        self.supabase: Client = get_supabase()
 
     async def store_memory(self, memory_text: str, embedding: List[float],
                            memory_type: str = 'fact', tags: Optional[List[str]] = None,
@@ -82,7 +84,10 @@ class MemoryInjector:
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Inject memory with metadata into AI memory system')
-    parser.add_argument('content', help='Memory content to store')
+    parser.add_argument('content', nargs='?', help='Memory content to store')
+    parser.add_argument('--stdin', action='store_true',
+                       help='Read newline-delimited JSON memories from stdin '
+                            '(keys: content, type, tags, source, importance, project_id)')
     parser.add_argument('--type', default='fact',
                        help='Memory type (fact, identity, preference, log, etc.)')
     parser.add_argument('--tags', help='Comma-separated tags (e.g., "perkTracker,fiona")')
@@ -91,7 +96,36 @@ def parse_arguments():
     parser.add_argument('--importance', type=int, default=1,
                        help='Importance level (1=low to 5=critical)')
     parser.add_argument('--project-id', help='Project identifier for memory partitioning (e.g., "personal", "work", "blog")')
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.stdin and args.content is None:
+        parser.error('content is required unless --stdin is given')
+    return args
+
+
+async def inject_from_stdin(injector: MemoryInjector) -> int:
+    """Inject one memory per JSON line on stdin, reusing the same clients; return the failure count."""
+    failures = 0
+    for line_number, line in enumerate(sys.stdin, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            tags = row.get('tags')
+            if isinstance(tags, str):
+                tags = parse_tags(tags)
+
+            await injector.inject_memory(
+                memory_text=row['content'],
+                memory_type=row.get('type', 'fact'),
+                tags=tags or None,
+                source=row.get('source', 'manual'),
+                importance=validate_importance(int(row.get('importance', 1))),
+                project_id=row.get('project_id')
+            )
+        except Exception as e:
+            failures += 1
+            print(f"❌ Line {line_number}: {e}")
+    return failures
 
 
 async def main() -> None:
@@ -99,6 +133,15 @@ async def main() -> None:
     try:
         args = parse_arguments()
 
+        if args.stdin:
+            # One long-lived process: clients and connections are shared across rows
+            injector = MemoryInjector()
+            failures = await inject_from_stdin(injector)
+            if failures:
+                print(f"⚠️  {failures} memories failed to inject")
+                sys.exit(1)
+            return
+
         # Validate importance
         importance = validate_importance(args.importance)
 
@@ -3,32 +3,112 @@
 
 import argparse
 import asyncio
+import hashlib
 import json
 import os
 import re
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import time
 
 # Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
 
+import aiohttp
 import tiktoken
-from openai import AsyncOpenAI
-from supabase import create_client, Client
+try:
+    import ijson
+except ImportError:  # fall back to loading the whole file with json
+    ijson = None
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+try:
+    import uvloop
+except ImportError:  # use the stock asyncio event loop
+    uvloop = None
 
+from app.clients import get_openai
 from app.config import config, parse_tags, validate_importance
-from app.memory.utils import get_embedding
+from utils import get_embeddings
+
+# JSON files at least this large are streamed with ijson instead of json.load
+JSON_STREAM_THRESHOLD = 1024 * 1024
+# Chunks per embedding request and insert; well under the API's input and token limits
+EMBED_BATCH_SIZE = 96
+# Concurrent summarization requests when --summarize is on
+SUMMARIZE_CONCURRENCY = 5
+# Chunks summarized together in one chat completion
+SUMMARY_GROUP_SIZE = 10
+# Pipeline workers per stage, and embedded batches allowed to wait for an insert worker
+EMBED_WORKERS = 2
+INSERT_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 4
+# Pooled keep-alive connections to the PostgREST endpoint
+POSTGREST_CONNECTIONS = 32
+# Chunk embeddings kept per loader, so re-processing an edited file only embeds new chunks
+EMBEDDING_CACHE_SIZE = 10_000
+
+# clean_text patterns, compiled once: 3+ line breaks, trailing whitespace per line, space runs
+_RE_BLANK_LINES = re.compile(r'\n\s*\n\s*\n+')
+_RE_TRAILING_WS = re.compile(r'[^\S\n]+(?=\n|\Z)')
+_RE_SPACES = re.compile(r' {2,}')
+# Whitespace after sentence-ending punctuation; chunk_text splits on it in one C-level pass
+_RE_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+# Filename keywords for each source type, in priority order
+SOURCE_KEYWORDS = {
+    'chat': ('chat', 'conversation', 'messages'),
+    'blog': ('blog', 'post', 'article'),
+    'email': ('email', 'mail'),
+    'documentation': ('doc', 'documentation', 'readme'),
+    'log': ('log', 'logs'),
+    'notes': ('note', 'notes'),
+}
+_SOURCE_BY_KEYWORD = {word: source for source, words in SOURCE_KEYWORDS.items() for word in words}
+_SOURCE_RANK = {source: rank for rank, source in enumerate(SOURCE_KEYWORDS)}
+# Lookahead so overlapping keywords (e.g. "dochat") are all found in one scan
+_RE_SOURCE = re.compile('(?=({}))'.format('|'.join(
+    sorted(map(re.escape, _SOURCE_BY_KEYWORD), key=len, reverse=True))))
+
+
+def load_json(data: bytes) -> Any:
+    """Parse a JSON document, using orjson when it is installed.
+
+    Documents orjson rejects but json accepts (integers over 64 bits, NaN) fall back to json.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine like asyncio.run, on a uvloop event loop when uvloop is installed."""
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coro)
+
+
+def dump_json_line(obj: Any) -> bytes:
+    """Serialize obj as one compact JSON line, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode('utf-8') + b"\n"
 
 
 class BatchMemoryLoader:
     """Handles batch loading of memories from files."""
 
     def __init__(self, project_id: Optional[str] = None, summarize: bool = False) -> None:
-        """Initialize OpenAI and Supabase clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
+        """Initialize the OpenAI client; the PostgREST session is opened on first insert."""
+        self.openai_client = get_openai()
+        self._session: Optional[aiohttp.ClientSession] = None
         self.tokenizer = tiktoken.get_encoding("cl100k_base")  # GPT-4 tokenizer
         self.project_id = project_id
         self.summarize = summarize
@@ -39,6 +119,31 @@ class BatchMemoryLoader:
         self.failed_inserts = 0
         self.skipped_chunks = 0
         self.summarized_chunks = 0
+        # Digest of (model, dimensions, chunk) -> embedding, least recently used first.
+        # Stored as tuples so rows built from one cached vector can't alter it
+        self.embedding_cache: Dict[bytes, Tuple[float, ...]] = {}
+        self.cached_embeddings = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared PostgREST session, creating it inside the running loop."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=config.supabase_url,
+                headers={
+                    "apikey": config.supabase_key,
+                    "Authorization": f"Bearer {config.supabase_key}",
+                    "Prefer": "return=minimal"
+                },
+                connector=aiohttp.TCPConnector(limit=POSTGREST_CONNECTIONS, ttl_dns_cache=300),
+                raise_for_status=True
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the PostgREST session; a later insert opens a new one."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def summarize_chunk(self, chunk: str) -> str:
         """Summarize a chunk to reduce cost and noise."""
@@ -70,29 +175,78 @@ class BatchMemoryLoader:
             print(f"⚠️  Summarization failed, using original text: {e}")
             return chunk
 
+    async def summarize_batch(self, chunks: List[str]) -> List[str]:
+        """Summarize chunks SUMMARY_GROUP_SIZE at a time, one chat completion per group.
+
+        Chunks missing from a group's response fall back to summarize_chunk.
+        """
+        results = list(chunks)
+        if not self.summarize:
+            return results
+        
+        pending = [i for i, chunk in enumerate(chunks) if len(chunk) >= 200]
+        groups = [pending[k:k + SUMMARY_GROUP_SIZE] for k in range(0, len(pending), SUMMARY_GROUP_SIZE)]
+        semaphore = asyncio.Semaphore(SUMMARIZE_CONCURRENCY)
+        
+        async def summarize_group(group: List[int]) -> None:
+            async with semaphore:
+                summaries = await self._request_summaries([chunks[i] for i in group])
+                for position, index in enumerate(group):
+                    summary = summaries.get(position)
+                    if summary:
+                        results[index] = summary
+                        self.summarized_chunks += 1
+                    else:
+                        results[index] = await self.summarize_chunk(chunks[index])
+        
+        await asyncio.gather(*(summarize_group(group) for group in groups))
+        return results
+
+    async def _request_summaries(self, chunks: List[str]) -> Dict[int, str]:
+        """Request numbered summaries of several chunks as one JSON response."""
+        prompt = "\n---\n".join(f"[{i}] {chunk}" for i, chunk in enumerate(chunks))
+        try:
+            response = await self.openai_client.chat.completions.create(
+                model="gpt-4o-mini",  # Use cheaper model for summarization
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Each text below starts with its number in brackets and texts are separated by ---. "
+                                   "Summarize each text concisely, preserving key information and context. "
+                                   "Keep each summary under 150 words. "
+                                   'Respond with JSON: {"summaries": [{"i": <number>, "summary": "<summary>"}]}'
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=200 * len(chunks),
+                temperature=0.3,
+                response_format={"type": "json_object"}
+            )
+            
+            items = json.loads(response.choices[0].message.content)["summaries"]
+            return {int(item["i"]): str(item["summary"]).strip() for item in items}
+        
+        except Exception as e:
+            print(f"⚠️  Batch summarization failed, summarizing chunks one at a time: {e}")
+            return {}
+
     def count_tokens(self, text: str) -> int:
         """Count tokens in text using tiktoken."""
-        return len(self.tokenizer.encode(text))
+        # encode_ordinary skips the special-token scan and treats "<|endoftext|>" as text
+        return len(self.tokenizer.encode_ordinary(text))
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens for several texts in one call; tiktoken encodes them in parallel."""
+        encoded = self.tokenizer.encode_ordinary_batch(texts, num_threads=os.cpu_count() or 1)
+        return [len(ids) for ids in encoded]
 
     def detect_source_from_filename(self, filepath: str) -> str:
         """Auto-detect source type from filename patterns."""
         filename = Path(filepath).stem.lower()
         
-        # Common patterns
-        if any(word in filename for word in ['chat', 'conversation', 'messages']):
-            return 'chat'
-        elif any(word in filename for word in ['blog', 'post', 'article']):
-            return 'blog'
-        elif any(word in filename for word in ['email', 'mail']):
-            return 'email'
-        elif any(word in filename for word in ['doc', 'documentation', 'readme']):
-            return 'documentation'
-        elif any(word in filename for word in ['log', 'logs']):
-            return 'log'
-        elif any(word in filename for word in ['note', 'notes']):
-            return 'notes'
-        else:
-            return 'file'
+        # Highest-priority source among all keywords in the name
+        sources = {_SOURCE_BY_KEYWORD[match.group(1)] for match in _RE_SOURCE.finditer(filename)}
+        return min(sources, key=_SOURCE_RANK.__getitem__, default='file')
 
     def read_file_content(self, filepath: str) -> str:
         """Read and return file content based on extension."""
@@ -103,8 +257,9 @@ class BatchMemoryLoader:
         
         try:
             if path.suffix.lower() == '.json':
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                if ijson is not None and path.stat().st_size >= JSON_STREAM_THRESHOLD:
+                    return self.stream_json_text(path)
+                data = load_json(path.read_bytes())
                 # Convert JSON to readable text
                 if isinstance(data, dict):
                     return json.dumps(data, indent=2)
@@ -123,135 +278,232 @@ class BatchMemoryLoader:
         except Exception as e:
             raise RuntimeError(f"Failed to read file {filepath}: {e}")
 
+    def stream_json_text(self, path: Path) -> str:
+        """Build the same text as read_file_content without materialising the JSON document."""
+        with open(path, 'rb') as f:
+            head = f.read(4096).lstrip()
+            f.seek(0)
+            
+            if head.startswith(b'['):
+                return '\n'.join(str(item) for item in ijson.items(f, 'item', use_float=True))
+            
+            if head.startswith(b'{'):
+                # Equivalent to json.dumps(data, indent=2), one top-level value at a time
+                parts = [
+                    f"  {json.dumps(key)}: " + json.dumps(value, indent=2).replace('\n', '\n  ')
+                    for key, value in ijson.kvitems(f, '', use_float=True)
+                ]
+                return "{\n" + ",\n".join(parts) + "\n}" if parts else "{}"
+            
+            return str(json.load(f))
+
     def clean_text(self, text: str) -> str:
         """Clean and normalize text content."""
         # Remove excessive whitespace
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+        text = _RE_BLANK_LINES.sub('\n\n', text)
         # Remove trailing whitespace from lines
-        text = '\n'.join(line.rstrip() for line in text.split('\n'))
+        text = _RE_TRAILING_WS.sub('', text)
         # Remove excessive spaces
-        text = re.sub(r' +', ' ', text)
-        return text.strip()
+        return _RE_SPACES.sub(' ', text).strip()
 
     def chunk_text(self, text: str, max_tokens: int = 500, overlap_tokens: int = 50) -> List[str]:
         """Split text into chunks of approximately max_tokens each with overlap."""
+        return [chunk for chunk, _ in self.chunk_text_with_tokens(text, max_tokens, overlap_tokens)]
+
+    def _window_end(self, ids: List[int], start: int, max_tokens: int) -> int:
+        """End of the token window starting at start, moved back to a word boundary."""
+        limit = start + max_tokens
+        token_bytes = self.tokenizer.decode_single_token_bytes
+        # Tokens carry their leading whitespace, so a word starts wherever one does
+        end = limit
+        while end > start + 1 and not token_bytes(ids[end])[:1].isspace():
+            end -= 1
+        if end > start + 1:
+            return end
+        # One word longer than the window: still never split a UTF-8 character
+        end = limit
+        while end > start + 1 and token_bytes(ids[end])[0] & 0xC0 == 0x80:
+            end -= 1
+        return end
+
+    def chunk_text_with_tokens(self, text: str, max_tokens: int = 500,
+                               overlap_tokens: int = 50) -> List[Tuple[str, int]]:
+        """Like chunk_text, but pair each chunk with its approximate token count."""
         if not text.strip():
             return []
         
         # Clean the text first
         text = self.clean_text(text)
         
-        # If text is short enough, return as single chunk
-        if self.count_tokens(text) <= max_tokens:
-            return [text] if text.strip() else []
+        # Encode each sentence exactly once; chunk sizes are sums of these counts
+        sentences = _RE_SENTENCE_BREAK.split(text)
+        encode = self.tokenizer.encode_ordinary
+        sentence_ids = [encode(sentence) for sentence in sentences]
         
-        chunks = []
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        # If text is short enough, return as single chunk
+        total_tokens = sum(len(ids) for ids in sentence_ids)
+        if total_tokens <= max_tokens:
+            return [(text, total_tokens)] if text.strip() else []
         
-        current_chunk = ""
+        chunks: List[Tuple[str, int]] = []
+        current_parts: List[str] = []
         current_tokens = 0
         
-        for sentence in sentences:
-            sentence_tokens = self.count_tokens(sentence)
+        def emit(parts: List[str], tokens: int) -> None:
+            chunk = " ".join(parts).strip()
+            if chunk:
+                chunks.append((chunk, tokens))
+        
+        for sentence, ids in zip(sentences, sentence_ids):
+            sentence_tokens = len(ids)
             
-            # If single sentence is too long, split it further
+            # If single sentence is too long, split it by token windows
             if sentence_tokens > max_tokens:
                 # Save current chunk if it has content
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-                    current_tokens = 0
-                
-                # Split long sentence by words
-                words = sentence.split()
-                temp_chunk = ""
-                temp_tokens = 0
+                emit(current_parts, current_tokens)
                 
-                for word in words:
-                    word_tokens = self.count_tokens(word + " ")
-                    if temp_tokens + word_tokens > max_tokens and temp_chunk:
-                        chunks.append(temp_chunk.strip())
-                        temp_chunk = word + " "
-                        temp_tokens = word_tokens
-                    else:
-                        temp_chunk += word + " "
-                        temp_tokens += word_tokens
-                
-                if temp_chunk.strip():
-                    current_chunk = temp_chunk
-                    current_tokens = temp_tokens
+                # Full windows become chunks; the remainder starts the next chunk
+                start = 0
+                while sentence_tokens - start > max_tokens:
+                    end = self._window_end(ids, start, max_tokens)
+                    emit([self.tokenizer.decode(ids[start:end])], end - start)
+                    start = end
+                current_parts = [self.tokenizer.decode(ids[start:]).strip()]
+                current_tokens = sentence_tokens - start
             
             # Normal sentence processing
             elif current_tokens + sentence_tokens > max_tokens:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
+                emit(current_parts, current_tokens)
+                current_parts = [sentence]
                 current_tokens = sentence_tokens
             else:
-                current_chunk += sentence + " "
+                current_parts.append(sentence)
                 current_tokens += sentence_tokens
         
         # Add final chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        emit(current_parts, current_tokens)
         
         # Filter out empty or very short chunks
-        valid_chunks = []
-        for chunk in chunks:
-            if chunk.strip() and len(chunk.strip()) > 10:  # Minimum 10 characters
-                valid_chunks.append(chunk.strip())
-        
-        return valid_chunks
+        return [(chunk, tokens) for chunk, tokens in chunks if len(chunk) > 10]  # Minimum 10 characters
 
-    async def store_chunk_with_retry(self, chunk: str, metadata: Dict[str, Any], 
-                                   max_retries: int = 3) -> Optional[Dict[str, Any]]:
-        """Store a single chunk with retry logic."""
+    async def _with_retry(self, action: str, call: Callable[[], Awaitable[Any]], count: int,
+                          max_retries: int = 3) -> Any:
+        """Await call(), retrying with exponential backoff; None once every attempt failed."""
         for attempt in range(max_retries):
             try:
-                # Apply summarization if enabled
-                processed_chunk = await self.summarize_chunk(chunk)
-                
-                # Generate embedding
-                embedding = await get_embedding(processed_chunk, self.openai_client)
-                
-                # Prepare data
-                data = {
-                    "content": processed_chunk,
-                    "embedding": embedding,
-                    "type": metadata["type"],
-                    "source": metadata["source"],
-                    "importance": metadata["importance"]
-                }
-                
-                # Add project_id if specified
-                if self.project_id:
-                    data["project_id"] = self.project_id
-                
-                if metadata.get("tags"):
-                    data["tags"] = metadata["tags"]
-                
-                # Insert into database
-                result = self.supabase.table(config.memory_table).insert(data).execute()
-                
-                if result.data:
-                    return result.data[0]
-                else:
-                    raise RuntimeError("No data returned from insert operation")
-                    
+                return await call()
             except Exception as e:
                 if attempt == max_retries - 1:
-                    print(f"❌ Failed to store chunk after {max_retries} attempts: {e}")
+                    print(f"❌ Failed to {action} {count} chunks after {max_retries} attempts: {e}")
                     return None
                 else:
-                    print(f"⚠️  Attempt {attempt + 1} failed, retrying: {e}")
+                    print(f"⚠️  Attempt {attempt + 1} to {action} failed, retrying batch: {e}")
                     await asyncio.sleep(2 ** attempt)  # Exponential backoff
         
         return None
 
+    async def embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """Embed chunks in one request, reusing cached embeddings of identical chunks."""
+        prefix = f"{config.embedding_model}\0{config.embedding_dimensions}\0"
+        keys = [
+            hashlib.blake2b((prefix + chunk).encode('utf-8'), digest_size=16).digest()
+            for chunk in chunks
+        ]
+        cache = self.embedding_cache
+        # Taken before awaiting, since another worker may evict entries meanwhile
+        found = {key: cache[key] for key in keys if key in cache}
+        missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in found}
+        if missing:
+            embeddings = await get_embeddings(list(missing.values()), self.openai_client)
+            found.update(zip(missing, map(tuple, embeddings)))
+        self.cached_embeddings += len(chunks) - len(missing)
+        
+        for key in keys:
+            # Re-insert to mark the entry as recently used
+            cache.pop(key, None)
+            cache[key] = found[key]
+        while len(cache) > EMBEDDING_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        return [list(found[key]) for key in keys]
+
+    def build_rows(self, chunks: List[str], embeddings: List[List[float]],
+                   metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build the memory rows for a batch of embedded chunks."""
+        rows = []
+        for chunk, embedding in zip(chunks, embeddings):
+            data = {
+                "content": chunk,
+                "embedding": embedding,
+                "type": metadata["type"],
+                "source": metadata["source"],
+                "importance": metadata["importance"]
+            }
+            
+            # Add project_id if specified
+            if self.project_id:
+                data["project_id"] = self.project_id
+            
+            if metadata.get("tags"):
+                data["tags"] = metadata["tags"]
+            rows.append(data)
+        return rows
+
+    async def insert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert rows in one PostgREST request (errors and 429s raise)."""
+        async with self._get_session().post(f"/rest/v1/{config.memory_table}", json=rows):
+            return len(rows)
+
+    async def store_batches(self, batches: List[List[str]], metadata: Dict[str, Any]) -> Dict[str, int]:
+        """Embed and insert batches of chunks as a two-stage pipeline.
+
+        Embedding workers feed a bounded queue of rows to insert workers, so the next
+        batch is embedded while the previous one is being written. Each stage retries
+        its own request for the whole batch. Returns stored and failed chunk counts.
+        """
+        counts = {"stored": 0, "failed": 0}
+        embed_queue: asyncio.Queue = asyncio.Queue()
+        insert_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        for batch in batches:
+            embed_queue.put_nowait(batch)
+        for _ in range(EMBED_WORKERS):
+            embed_queue.put_nowait(None)
+        
+        async def embed_worker() -> None:
+            while (batch := await embed_queue.get()) is not None:
+                # Apply summarization if enabled (once, before the retried requests)
+                batch = await self.summarize_batch(batch)
+                embeddings = await self._with_retry(
+                    "embed", lambda: self.embed_chunks(batch), len(batch))
+                if embeddings is None:
+                    counts["failed"] += len(batch)
+                else:
+                    await insert_queue.put(self.build_rows(batch, embeddings, metadata))
+        
+        async def insert_worker() -> None:
+            while (rows := await insert_queue.get()) is not None:
+                stored = await self._with_retry("store", lambda: self.insert_rows(rows), len(rows)) or 0
+                counts["stored"] += stored
+                counts["failed"] += len(rows) - stored
+        
+        async with asyncio.TaskGroup() as tg:
+            embedders = [tg.create_task(embed_worker()) for _ in range(EMBED_WORKERS)]
+            for _ in range(INSERT_WORKERS):
+                tg.create_task(insert_worker())
+            await asyncio.gather(*embedders)
+            for _ in range(INSERT_WORKERS):
+                await insert_queue.put(None)
+        
+        return counts
+
     async def process_file(self, filepath: str, source: Optional[str] = None,
-                          tags: Optional[List[str]] = None, importance: int = 1) -> None:
-        """Process a single file and load all chunks into memory."""
+                          tags: Optional[List[str]] = None, importance: int = 1) -> Dict[str, int]:
+        """Process a single file and load all chunks into memory.
+
+        Returns this file's chunk counts (total, successful, failed, skipped); the
+        loader-wide totals are updated as well.
+        """
         print(f"📁 Processing file: {filepath}")
+        stats = {"total": 0, "successful": 0, "failed": 0, "skipped": 0}
         
         try:
             # Read file content
@@ -263,12 +515,13 @@ class BatchMemoryLoader:
                 source = self.detect_source_from_filename(filepath)
             
             # Chunk the content
-            chunks = self.chunk_text(content)
+            chunked = self.chunk_text_with_tokens(content)
+            chunks = [chunk for chunk, _ in chunked]
             print(f"🔪 Split into {len(chunks)} chunks")
             
             if not chunks:
                 print("⚠️  No valid chunks found, skipping file")
-                return
+                return stats
             
             # Prepare metadata
             metadata = {
@@ -281,44 +534,39 @@ class BatchMemoryLoader:
             # Process chunks with progress tracking
             print(f"🚀 Processing {len(chunks)} chunks...")
             
-            # Process chunks in batches to avoid overwhelming the API
-            batch_size = 5
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                tasks = []
+            # One embedding request and one insert per batch of chunks
+            batches = []
+            for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+                batch = []
                 
-                for j, chunk in enumerate(batch):
-                    self.total_chunks += 1
+                for j, (chunk, chunk_tokens) in enumerate(chunked[i:i + EMBED_BATCH_SIZE]):
+                    stats["total"] += 1
                     chunk_num = i + j + 1
-                    print(f"  📝 Processing chunk {chunk_num}/{len(chunks)} ({len(chunk)} chars, ~{self.count_tokens(chunk)} tokens)")
+                    print(f"  📝 Processing chunk {chunk_num}/{len(chunks)} ({len(chunk)} chars, ~{chunk_tokens} tokens)")
                     
                     if not chunk.strip():
-                        self.skipped_chunks += 1
+                        stats["skipped"] += 1
                         continue
                     
-                    task = self.store_chunk_with_retry(chunk, metadata)
-                    tasks.append(task)
-                
-                # Wait for batch to complete
-                if tasks:
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    for result in results:
-                        if isinstance(result, Exception):
-                            self.failed_inserts += 1
-                        elif result is not None:
-                            self.successful_inserts += 1
-                        else:
-                            self.failed_inserts += 1
+                    batch.append(chunk)
                 
-                # Small delay between batches
-                if i + batch_size < len(chunks):
-                    await asyncio.sleep(1)
+                if batch:
+                    batches.append(batch)
+            
+            counts = await self.store_batches(batches, metadata)
+            stats["successful"] += counts["stored"]
+            stats["failed"] += counts["failed"]
             
             print(f"✅ Completed processing {filepath}")
             
         except Exception as e:
             print(f"❌ Error processing file {filepath}: {e}")
+        
+        self.total_chunks += stats["total"]
+        self.successful_inserts += stats["successful"]
+        self.failed_inserts += stats["failed"]
+        self.skipped_chunks += stats["skipped"]
+        return stats
 
     def print_summary(self) -> None:
         """Print processing summary."""
@@ -329,6 +577,8 @@ class BatchMemoryLoader:
         print(f"Successfully stored: {self.successful_inserts}")
         print(f"Failed to store: {self.failed_inserts}")
         print(f"Skipped (empty): {self.skipped_chunks}")
+        if self.cached_embeddings:
+            print(f"Reused cached embeddings: {self.cached_embeddings}")
         
         if self.summarize:
             print(f"Summarized chunks: {self.summarized_chunks}")
@@ -397,12 +647,15 @@ async def main() -> None:
         
         # Process file
         start_time = time.time()
-        await loader.process_file(
-            filepath=args.filepath,
-            source=args.source,
-            tags=tags,
-            importance=importance
-        )
+        try:
+            await loader.process_file(
+                filepath=args.filepath,
+                source=args.source,
+                tags=tags,
+                importance=importance
+            )
+        finally:
+            await loader.close()
         
         # Print summary
         end_time = time.time()
@@ -423,4 +676,4 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
@@ -3,17 +3,87 @@
 
 import asyncio
 import json
+import os
+import sys
 import time
-from datetime import datetime, timedelta
+from collections import Counter, deque
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-import statistics
+from typing import Deque, Dict, Iterator, List, Optional, Any
 from dataclasses import dataclass, asdict
 
 from config import config
-from helpers import get_embedding
-from supabase import create_client, Client
-from openai import AsyncOpenAI
+from utils import get_embeddings
+from app.clients import get_openai, get_supabase
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Rotate the metrics log to <name>.1 once it grows past this size
+ROTATE_BYTES = 5 * 1024 * 1024
+
+# Buffered health records are written out every FLUSH_SIZE records or FLUSH_INTERVAL seconds
+FLUSH_SIZE = 32
+FLUSH_INTERVAL = 60.0
+
+# Block size used when reading the metrics log backwards
+TAIL_CHUNK_BYTES = 64 * 1024
+
+# Number of probe texts sent in the single embedding request per health check
+EMBED_PROBE_BATCH = 4
+
+# Memory readings are reused for this many seconds
+MEMORY_SNAPSHOT_TTL = 2.0
+
+# Only every Nth logged record is decoded when computing the error rate
+ERROR_RATE_SAMPLE_RATE = 10
+
+# Length of the "YYYY-MM-DDTHH:MM" prefix of an ISO timestamp, used as a minute bucket key
+MINUTE_KEY_LENGTH = 16
+
+
+def iter_lines_reversed(path: Path, chunk_size: int = TAIL_CHUNK_BYTES) -> Iterator[str]:
+    """Yield the non-empty lines of a file from last to first, reading from the end."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            # The first piece may be the tail of a line that starts in an earlier block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line.decode('utf-8')
+        if remainder.strip():
+            yield remainder.decode('utf-8')
+
+
+def dump_json_line(obj: Any) -> bytes:
+    """Serialize obj as one compact JSONL line, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, separators=(",", ":")).encode('utf-8') + b"\n"
+
+
+def load_json(data) -> Any:
+    """Parse a JSON document, using orjson when it is installed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@lru_cache(maxsize=1)
+def _memory_snapshot(ttl_bucket: int):
+    """Read system memory once per TTL bucket; the argument only keys the cache."""
+    return psutil.virtual_memory()
 
 
 @dataclass
@@ -39,9 +109,19 @@ class SystemHealth:
 class HealthMonitor:
     """Monitors system health and performance metrics."""
     
-    def __init__(self, metrics_file: str = "health_metrics.json"):
+    def __init__(self, metrics_file: str = "health_metrics.jsonl",
+                 flush_size: int = FLUSH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 sample_rate: int = ERROR_RATE_SAMPLE_RATE):
         """Initialize health monitor."""
         self.metrics_file = Path(metrics_file)
+        self.sample_rate = max(1, sample_rate)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[SystemHealth] = deque(maxlen=256)
+        self._last_flush = time.monotonic()
+        # Rolling error-rate window: minute key -> [errors, total], seeded from the log once
+        self._minute_buckets: Dict[str, List[int]] = {}
+        self._bucket_window_hours: Optional[int] = None
         self.supabase_client = None
         self.openai_client = None
         
@@ -53,15 +133,25 @@ class HealthMonitor:
             "memory_usage": {"warning": 80.0, "critical": 95.0}  # percentage
         }
         
+        # (warning, critical) pairs so classification is a tuple index
+        self._class = {name: (thr["warning"], thr["critical"]) for name, thr in self.thresholds.items()}
+        
         print("📊 Health Monitor initialized")
     
+    _STATUS = ("healthy", "warning", "critical")
+    
+    def _classify(self, name: str, value: float) -> str:
+        """Map a metric value to its status using the precomputed thresholds."""
+        warning, critical = self._class[name]
+        return self._STATUS[(value >= warning) + (value >= critical)]
+    
     def get_clients(self):
         """Initialize API clients if not already done."""
         if self.supabase_client is None:
-            self.supabase_client = create_client(config.supabase_url, config.supabase_key)
+            self.supabase_client = get_supabase()
         
         if self.openai_client is None:
-            self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
+            self.openai_client = get_openai()
     
     async def measure_embedding_performance(self) -> HealthMetric:
         """Measure OpenAI embedding API performance."""
@@ -70,30 +160,30 @@ class HealthMonitor:
         test_text = "Health monitoring test for embedding performance measurement."
         
         try:
-            start_time = time.time()
-            await get_embedding(test_text, self.openai_client)
-            response_time = time.time() - start_time
+            # One batched request exercises the same path as bulk ingestion
+            start_time = time.perf_counter()
+            await get_embeddings([test_text] * EMBED_PROBE_BATCH, self.openai_client)
+            response_time = time.perf_counter() - start_time
             
-            # Determine status
-            if response_time < self.thresholds["embedding_response_time"]["warning"]:
-                status = "healthy"
-            elif response_time < self.thresholds["embedding_response_time"]["critical"]:
-                status = "warning"
-            else:
-                status = "critical"
+            status = self._classify("embedding_response_time", response_time)
             
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="embedding_response_time",
                 value=response_time,
                 unit="seconds",
                 status=status,
-                details={"model": config.embedding_model, "dimensions": config.embedding_dimensions}
+                details={
+                    "model": config.embedding_model,
+                    "dimensions": config.embedding_dimensions,
+                    "batch_size": EMBED_PROBE_BATCH,
+                    "per_text_seconds": round(response_time / EMBED_PROBE_BATCH, 4)
+                }
             )
             
         except Exception as e:
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="embedding_response_time",
                 value=-1,
                 unit="seconds",
@@ -106,33 +196,29 @@ class HealthMonitor:
         self.get_clients()
         
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             
-            # Simple query to test database responsiveness
-            response = self.supabase_client.table(config.memory_table).select("id").limit(1).execute()
+            # One query checks responsiveness and reports the row count; the client is
+            # synchronous, so run it in a thread to let the embedding probe overlap
+            query = self.supabase_client.table(config.memory_table).select("id", count="exact").limit(1)
+            response = await asyncio.to_thread(query.execute)
             
-            response_time = time.time() - start_time
+            response_time = time.perf_counter() - start_time
             
-            # Determine status
-            if response_time < self.thresholds["database_response_time"]["warning"]:
-                status = "healthy"
-            elif response_time < self.thresholds["database_response_time"]["critical"]:
-                status = "warning"
-            else:
-                status = "critical"
+            status = self._classify("database_response_time", response_time)
             
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="database_response_time",
                 value=response_time,
                 unit="seconds",
                 status=status,
-                details={"table": config.memory_table}
+                details={"table": config.memory_table, "row_count": response.count}
             )
             
         except Exception as e:
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="database_response_time",
                 value=-1,
                 unit="seconds",
@@ -143,21 +229,16 @@ class HealthMonitor:
     def measure_memory_usage(self) -> HealthMetric:
         """Measure system memory usage."""
         try:
-            import psutil
+            if psutil is None:
+                raise ImportError("psutil")
             
-            memory = psutil.virtual_memory()
+            memory = _memory_snapshot(int(time.monotonic() / MEMORY_SNAPSHOT_TTL))
             usage_percent = memory.percent
             
-            # Determine status
-            if usage_percent < self.thresholds["memory_usage"]["warning"]:
-                status = "healthy"
-            elif usage_percent < self.thresholds["memory_usage"]["critical"]:
-                status = "warning"
-            else:
-                status = "critical"
+            status = self._classify("memory_usage", usage_percent)
             
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="memory_usage",
                 value=usage_percent,
                 unit="percent",
@@ -171,7 +252,7 @@ class HealthMonitor:
             
         except ImportError:
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="memory_usage",
                 value=-1,
                 unit="percent",
@@ -180,7 +261,7 @@ class HealthMonitor:
             )
         except Exception as e:
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="memory_usage",
                 value=-1,
                 unit="percent",
@@ -188,12 +269,41 @@ class HealthMonitor:
                 details={"error": str(e)}
             )
     
+    def _bump_minute_bucket(self, timestamp: str, status: str, weight: int = 1):
+        """Count one metric (times weight) in the bucket for its minute."""
+        bucket = self._minute_buckets.setdefault(timestamp[:MINUTE_KEY_LENGTH], [0, 0])
+        bucket[0] += weight * (status == 'critical')
+        bucket[1] += weight
+    
+    def _seed_minute_buckets(self, cutoff_iso: str):
+        """Rebuild the rolling window from buffered records and the metrics log."""
+        self._minute_buckets = {}
+        
+        # Records still waiting in the write buffer are the newest
+        for health in self._buffer:
+            for metric in health.metrics:
+                if metric.timestamp > cutoff_iso:
+                    self._bump_minute_bucket(metric.timestamp, metric.status)
+        
+        # Walk the log newest-first, decoding one record in sample_rate and scaling
+        # its counts back up; stop at the first sampled record outside the window
+        if self.metrics_file.exists():
+            for index, line in enumerate(iter_lines_reversed(self.metrics_file)):
+                if index % self.sample_rate:
+                    continue
+                entry = load_json(line)
+                if entry.get('timestamp', '') <= cutoff_iso:
+                    break
+                for metric in entry.get('metrics', ()):
+                    if metric['timestamp'] > cutoff_iso:
+                        self._bump_minute_bucket(metric['timestamp'], metric['status'], self.sample_rate)
+    
     def calculate_error_rate(self, time_window_hours: int = 24) -> HealthMetric:
         """Calculate error rate from recent metrics."""
         try:
-            if not self.metrics_file.exists():
+            if not self.metrics_file.exists() and not self._buffer and not self._minute_buckets:
                 return HealthMetric(
-                    timestamp=datetime.now().isoformat(),
+                    timestamp=datetime.now(timezone.utc).isoformat(),
                     metric_name="error_rate",
                     value=0.0,
                     unit="ratio",
@@ -201,51 +311,41 @@ class HealthMonitor:
                     details={"note": "No historical data available"}
                 )
             
-            # Load recent metrics
-            with open(self.metrics_file, 'r') as f:
-                historical_data = json.load(f)
-            
-            # Filter metrics from the last time window
-            cutoff_time = datetime.now() - timedelta(hours=time_window_hours)
-            recent_metrics = []
+            # All timestamps are UTC ISO-8601 strings, which sort lexicographically, so the
+            # window check is a plain string compare
+            cutoff_iso = (datetime.now(timezone.utc) - timedelta(hours=time_window_hours)).isoformat()
+            if self._bucket_window_hours != time_window_hours:
+                self._seed_minute_buckets(cutoff_iso)
+                self._bucket_window_hours = time_window_hours
             
-            for entry in historical_data:
-                if 'metrics' in entry:
-                    for metric in entry['metrics']:
-                        metric_time = datetime.fromisoformat(metric['timestamp'])
-                        if metric_time > cutoff_time:
-                            recent_metrics.append(metric)
+            # Drop minutes that have left the window, then sum what remains
+            cutoff_minute = cutoff_iso[:MINUTE_KEY_LENGTH]
+            for minute in [m for m in self._minute_buckets if m < cutoff_minute]:
+                del self._minute_buckets[minute]
+            error_count = sum(errors for errors, _ in self._minute_buckets.values())
+            total = sum(count for _, count in self._minute_buckets.values())
             
-            if not recent_metrics:
-                error_rate = 0.0
-            else:
-                error_count = sum(1 for m in recent_metrics if m['status'] == 'critical')
-                error_rate = error_count / len(recent_metrics)
+            error_rate = error_count / total if total else 0.0
             
-            # Determine status
-            if error_rate < self.thresholds["error_rate"]["warning"]:
-                status = "healthy"
-            elif error_rate < self.thresholds["error_rate"]["critical"]:
-                status = "warning"
-            else:
-                status = "critical"
+            status = self._classify("error_rate", error_rate)
             
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="error_rate",
                 value=error_rate,
                 unit="ratio",
                 status=status,
                 details={
                     "time_window_hours": time_window_hours,
-                    "total_metrics": len(recent_metrics),
-                    "error_count": sum(1 for m in recent_metrics if m['status'] == 'critical')
+                    "sample_rate": self.sample_rate,
+                    "total_metrics": total,
+                    "error_count": error_count
                 }
             )
             
         except Exception as e:
             return HealthMetric(
-                timestamp=datetime.now().isoformat(),
+                timestamp=datetime.now(timezone.utc).isoformat(),
                 metric_name="error_rate",
                 value=-1,
                 unit="ratio",
@@ -253,24 +353,30 @@ class HealthMonitor:
                 details={"error": str(e)}
             )
     
+    async def _safe(self, coro, metric_name: str, unit: str = "seconds") -> HealthMetric:
+        """Await a metric probe, reporting any unexpected exception as a critical metric."""
+        try:
+            return await coro
+        except Exception as e:
+            print(f"⚠️  Error collecting async metric: {e}")
+            return HealthMetric(
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                metric_name=metric_name,
+                value=-1,
+                unit=unit,
+                status="critical",
+                details={"error": str(e)}
+            )
+    
     async def collect_all_metrics(self) -> List[HealthMetric]:
         """Collect all health metrics."""
         print("📊 Collecting health metrics...")
         
-        metrics = []
-        
-        # Async metrics
-        async_metrics = await asyncio.gather(
-            self.measure_embedding_performance(),
-            self.measure_database_performance(),
-            return_exceptions=True
-        )
-        
-        for metric in async_metrics:
-            if isinstance(metric, HealthMetric):
-                metrics.append(metric)
-            else:
-                print(f"⚠️  Error collecting async metric: {metric}")
+        # Async metrics; _safe turns a failed probe into a critical metric
+        metrics = list(await asyncio.gather(
+            self._safe(self.measure_embedding_performance(), "embedding_response_time"),
+            self._safe(self.measure_database_performance(), "database_response_time")
+        ))
         
         # Sync metrics
         metrics.append(self.measure_memory_usage())
@@ -291,11 +397,12 @@ class HealthMonitor:
     
     def generate_summary(self, metrics: List[HealthMetric]) -> Dict[str, Any]:
         """Generate health summary statistics."""
+        counts = Counter(m.status for m in metrics)
         summary = {
             "total_metrics": len(metrics),
-            "healthy_count": sum(1 for m in metrics if m.status == "healthy"),
-            "warning_count": sum(1 for m in metrics if m.status == "warning"),
-            "critical_count": sum(1 for m in metrics if m.status == "critical"),
+            "healthy_count": counts["healthy"],
+            "warning_count": counts["warning"],
+            "critical_count": counts["critical"],
             "metrics_by_type": {}
         }
         
@@ -311,57 +418,74 @@ class HealthMonitor:
         return summary
     
     def save_health_data(self, health: SystemHealth):
-        """Save health data to file."""
+        """Buffer health data, writing it out once enough records or time have accumulated."""
+        self._buffer.append(health)
+        # Once the rolling window is seeded, keep it current without rereading the log
+        if self._bucket_window_hours is not None:
+            for metric in health.metrics:
+                self._bump_minute_bucket(metric.timestamp, metric.status)
+        if (len(self._buffer) >= self.flush_size
+                or time.monotonic() - self._last_flush > self.flush_interval):
+            self.flush()
+    
+    def flush(self):
+        """Append all buffered health data to the JSONL metrics log."""
+        if not self._buffer:
+            return
         try:
-            # Load existing data
-            historical_data = []
-            if self.metrics_file.exists():
-                with open(self.metrics_file, 'r') as f:
-                    historical_data = json.load(f)
-            
-            # Add new data
-            historical_data.append(asdict(health))
+            # Rotate instead of trimming so each save only appends
+            if self.metrics_file.exists() and self.metrics_file.stat().st_size > ROTATE_BYTES:
+                self.metrics_file.replace(self.metrics_file.with_name(self.metrics_file.name + ".1"))
             
-            # Keep only last 1000 entries to prevent file from growing too large
-            if len(historical_data) > 1000:
-                historical_data = historical_data[-1000:]
+            with open(self.metrics_file, 'ab') as f:
+                f.write(b"".join(dump_json_line(asdict(health)) for health in self._buffer))
             
-            # Save updated data
-            with open(self.metrics_file, 'w') as f:
-                json.dump(historical_data, f, indent=2)
-            
-            print(f"💾 Health data saved to {self.metrics_file}")
+            print(f"💾 Health data saved to {self.metrics_file} ({len(self._buffer)} records)")
+            self._buffer.clear()
             
         except Exception as e:
             print(f"❌ Error saving health data: {e}")
+        finally:
+            self._last_flush = time.monotonic()
+    
+    async def aclose(self):
+        """Write out any buffered health data."""
+        self.flush()
     
     def display_health_report(self, health: SystemHealth):
         """Display formatted health report."""
-        print("\n" + "=" * 50)
-        print("🏥 SYSTEM HEALTH REPORT")
-        print("=" * 50)
-        print(f"Timestamp: {health.timestamp}")
-        print(f"Overall Status: {self.format_status(health.overall_status)}")
-        print()
+        lines = [
+            "\n" + "=" * 50,
+            "🏥 SYSTEM HEALTH REPORT",
+            "=" * 50,
+            f"Timestamp: {health.timestamp}",
+            f"Overall Status: {self.format_status(health.overall_status)}",
+            "",
+            "📊 Metrics:"
+        ]
         
-        print("📊 Metrics:")
         for metric in health.metrics:
             status_icon = self.get_status_icon(metric.status)
             if metric.value >= 0:
-                print(f"  {status_icon} {metric.metric_name}: {metric.value:.3f} {metric.unit}")
+                lines.append(f"  {status_icon} {metric.metric_name}: {metric.value:.3f} {metric.unit}")
             else:
-                print(f"  {status_icon} {metric.metric_name}: ERROR")
+                lines.append(f"  {status_icon} {metric.metric_name}: ERROR")
             
             if metric.details:
                 for key, value in metric.details.items():
                     if key != "error":
-                        print(f"      {key}: {value}")
+                        lines.append(f"      {key}: {value}")
+        
+        lines += [
+            f"\n📈 Summary:",
+            f"  Total Metrics: {health.summary['total_metrics']}",
+            f"  Healthy: {health.summary['healthy_count']}",
+            f"  Warnings: {health.summary['warning_count']}",
+            f"  Critical: {health.summary['critical_count']}"
+        ]
         
-        print(f"\n📈 Summary:")
-        print(f"  Total Metrics: {health.summary['total_metrics']}")
-        print(f"  Healthy: {health.summary['healthy_count']}")
-        print(f"  Warnings: {health.summary['warning_count']}")
-        print(f"  Critical: {health.summary['critical_count']}")
+        # One write instead of a print per line
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def format_status(self, status: str) -> str:
         """Format status with appropriate emoji."""
@@ -396,7 +520,7 @@ class HealthMonitor:
         
         # Create health object
         health = SystemHealth(
-            timestamp=datetime.now().isoformat(),
+            timestamp=datetime.now(timezone.utc).isoformat(),
             overall_status=overall_status,
             metrics=metrics,
             summary=summary
@@ -433,9 +557,10 @@ async def main():
     except Exception as e:
         print(f"\n❌ Health check failed: {e}")
         return 1
+    finally:
+        await monitor.aclose()
 
 
 if __name__ == "__main__":
-    import sys
     exit_code = asyncio.run(main())
     sys.exit(exit_code)
@@ -4,28 +4,145 @@
 import argparse
 import asyncio
 import ast
-import os
+import json
 import sys
 import time
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 # Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
 
 import numpy as np
-from openai import AsyncOpenAI
-from supabase import create_client, Client
+from supabase import Client
+from app.clients import get_openai, get_supabase
 from app.config import config, parse_tags
 from app.memory.utils import get_embedding
+from utils import halfvec_param
+
+# Files holding the local id + embedding index used by --local
+LOCAL_INDEX_EMBEDDINGS = Path("memory_index_embeddings.npy")
+LOCAL_INDEX_IDS = Path("memory_index_ids.npy")
+INDEX_PAGE_SIZE = 1000
+MEMORY_COLUMNS = "id, content, type, tags, source, importance, metadata, project_id, created_at"
+
+
+class LocalIndex:
+    """Cosine top-k over a local float32 matrix of memory embeddings."""
+
+    def __init__(self, embeddings_path: Path = LOCAL_INDEX_EMBEDDINGS,
+                 ids_path: Path = LOCAL_INDEX_IDS) -> None:
+        self.embeddings_path = embeddings_path
+        self.ids_path = ids_path
+        self._mat: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+
+    def exists(self) -> bool:
+        """Return True if both index files are present."""
+        return self.embeddings_path.exists() and self.ids_path.exists()
+
+    def build(self, supabase: Client) -> int:
+        """Download every id + embedding, store unit-normalised rows, and return the row count."""
+        ids: List[str] = []
+        vectors: List[List[float]] = []
+        start = 0
+        while True:
+            page = (supabase.table(config.memory_table).select("id, embedding")
+                    .range(start, start + INDEX_PAGE_SIZE - 1).execute()).data or []
+            for row in page:
+                if row.get('embedding'):
+                    ids.append(row['id'])
+                    # PostgREST serializes pgvector columns as "[x,y,...]" strings
+                    embedding = row['embedding']
+                    vectors.append(json.loads(embedding) if isinstance(embedding, str) else embedding)
+            if len(page) < INDEX_PAGE_SIZE:
+                break
+            start += INDEX_PAGE_SIZE
+
+        mat = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        np.save(self.embeddings_path, mat / norms)
+        np.save(self.ids_path, np.asarray(ids))
+        self._mat = self._ids = None
+        return len(ids)
+
+    def search(self, query_embedding: List[float], limit: int) -> List[tuple]:
+        """Return (id, similarity) pairs for the closest rows, best first."""
+        if self._mat is None:
+            # Memory-map the matrix so only the pages touched by the product are read
+            self._mat = np.load(self.embeddings_path, mmap_mode='r')
+            self._ids = np.load(self.ids_path)
+        if not len(self._ids):
+            return []
+
+        q = np.array(query_embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = self._mat @ q
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self._ids[i]), float(scores[i])) for i in top]
 
 
 class MemoryRetriever:
     """Handles memory retrieval with similarity search and filtering."""
 
-    def __init__(self) -> None:
-        """Initialize OpenAI and Supabase clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
+    _ROW_TMPL = (
+        "{i}. Similarity: {sim:.4f}\n"
+        "   Content: {content}\n"
+        "   Type: {type} | Source: {source} | Importance: {importance}\n"
+        "   Tags: {tags} | Project: {project}\n"
+        "   Created: {created}\n"
+        + "-" * 80 + "\n"
+    )
+
+    def __init__(self, use_local_index: bool = False) -> None:
+        """Attach the shared OpenAI and Supabase clients."""
+        self.openai_client = get_openai()
+        self.supabase: Client = get_supabase()
+        self.local_index = LocalIndex() if use_local_index else None
+
+    def format_rows(self, memories: List[Dict[str, Any]]) -> str:
+        """Format search results as one numbered text block."""
+        return "".join(
+            self._ROW_TMPL.format(
+                i=i,
+                sim=memory.get('similarity', 'N/A'),
+                content=memory.get('content', 'No content'),
+                type=memory.get('type', 'Unknown'),
+                source=memory.get('source', 'Unknown'),
+                importance=memory.get('importance', 'N/A'),
+                tags=memory.get('tags', []),
+                project=memory.get('project_id', 'N/A'),
+                created=memory.get('created_at', 'Unknown date')
+            )
+            for i, memory in enumerate(memories, 1)
+        )
+
+    def search_local_index(self, query_embedding: List[float], limit: int) -> List[Dict[str, Any]]:
+        """Rank with the local index, then fetch only the winning rows in one query."""
+        if not self.local_index.exists():
+            print("Building local memory index...")
+            print(f"Indexed {self.local_index.build(self.supabase)} memories")
+
+        ranked = self.local_index.search(query_embedding, limit)
+        if not ranked:
+            return []
+
+        result = (self.supabase.table(config.memory_table).select(MEMORY_COLUMNS)
+                  .in_('id', [memory_id for memory_id, _ in ranked]).execute())
+        rows = {row['id']: row for row in result.data or []}
+
+        # Keep the local ranking; ids deleted since the index was built are skipped
+        memories = []
+        for memory_id, score in ranked:
+            row = rows.get(memory_id)
+            if row is not None:
+                row['similarity'] = score
+                memories.append(row)
+        return memories
 
     async def search_similar_memories(self, query_embedding: List[float], limit: int = 3,
                                       memory_type: Optional[str] = None,
@@ -33,9 +150,26 @@ class MemoryRetriever:
                                       importance_min: Optional[int] = None,
                                       project_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Search for similar memories using vector similarity with filtering."""
+        return self.find_similar_memories(
+            query_embedding, limit, memory_type, tags, importance_min, project_id
+        )
+
+    def find_similar_memories(self, query_embedding: List[float], limit: int = 3,
+                              memory_type: Optional[str] = None,
+                              tags: Optional[List[str]] = None,
+                              importance_min: Optional[int] = None,
+                              project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Blocking form of search_similar_memories, for callers that run it in a thread."""
+        # The local index only ranks by similarity, so filtered searches go to the RPC
+        if self.local_index is not None and not (memory_type or tags or importance_min or project_id):
+            try:
+                return self.search_local_index(query_embedding, limit)
+            except Exception as e:
+                raise RuntimeError(f"Failed to search local index: {e}")
+
         try:
             rpc_params = {
-                'query_embedding': query_embedding,
+                'query_embedding': halfvec_param(query_embedding),
                 'match_count': limit,
             }
             
@@ -98,22 +232,8 @@ class MemoryRetriever:
         print(f"\n🔍 Found {len(similar_memories)} similar memories:")
         print("=" * 80)
 
-        for i, memory in enumerate(similar_memories, 1):
-            similarity_score = memory.get('similarity', 'N/A')
-            content = memory.get('content', 'No content')
-            created_at = memory.get('created_at', 'Unknown date')
-            memory_type_val = memory.get('type', 'Unknown')
-            tags_val = memory.get('tags', [])
-            source_val = memory.get('source', 'Unknown')
-            importance_val = memory.get('importance', 'N/A')
-            project_val = memory.get('project_id', 'N/A')
-
-            print(f"{i}. Similarity: {similarity_score:.4f}")
-            print(f"   Content: {content}")
-            print(f"   Type: {memory_type_val} | Source: {source_val} | Importance: {importance_val}")
-            print(f"   Tags: {tags_val} | Project: {project_val}")
-            print(f"   Created: {created_at}")
-            print("-" * 80)
+        # Format every row with one template and write the block at once
+        sys.stdout.write(self.format_rows(similar_memories))
 
         return similar_memories
 
@@ -127,6 +247,10 @@ def parse_arguments():
     parser.add_argument('--importance-min', type=int, help='Minimum importance level (1-5)')
     parser.add_argument('--limit', type=int, default=3, help='Maximum number of results (default: 3)')
     parser.add_argument('--project-id', help='Filter by project identifier (e.g., "personal", "work", "blog")')
+    parser.add_argument('--local', action='store_true',
+                        help='Rank unfiltered queries against a local embedding index instead of the match_memories RPC')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Re-download the local embedding index before searching (implies --local)')
     return parser.parse_args()
 
 
@@ -138,7 +262,9 @@ async def main() -> None:
         # Parse tags if provided
         tags = parse_tags(args.tags) if args.tags else None
 
-        retriever = MemoryRetriever()
+        retriever = MemoryRetriever(use_local_index=args.local or args.rebuild_index)
+        if args.rebuild_index:
+            print(f"Indexed {retriever.local_index.build(retriever.supabase)} memories")
         await retriever.retrieve_similar(
             query=args.query,
             limit=args.limit,
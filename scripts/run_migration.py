@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Run database migrations."""
 
+import shutil
 import sys
 from pathlib import Path
 from supabase import create_client
@@ -13,28 +14,22 @@ def run_migration(sql_file: Path):
     try:
         client = create_client(config.supabase_url, config.supabase_key)
         
-        # Read SQL file
-        sql = sql_file.read_text()
+        # Read SQL file (decoded once; it is sent as-is)
+        sql = sql_file.read_bytes().decode('utf-8')
         
-        # Split into individual statements and execute
-        statements = [s.strip() for s in sql.split(';') if s.strip()]
+        # Send the whole file in one exec_sql call: a single round-trip, run by
+        # PostgREST in one transaction, and function bodies containing ';' stay intact
+        client.rpc('exec_sql', {'sql': sql}).execute()
+        print(f"✅ Migration applied: {sql_file.name}")
         
-        for i, statement in enumerate(statements, 1):
-            if statement:
-                print(f"  Executing statement {i}/{len(statements)}...")
-                # Note: Supabase Python client doesn't have direct SQL execution
-                # You'll need to run this in Supabase SQL Editor
-                print(f"  Statement: {statement[:100]}...")
+        return True
         
+    except Exception as e:
+        print(f"❌ Error: {e}")
         print(f"\n⚠️  Please run this migration manually in Supabase SQL Editor:")
         print(f"  1. Go to: https://supabase.com/dashboard/project/{config.supabase_url.split('//')[1].split('.')[0]}/sql/new")
         print(f"  2. Copy and paste the contents of: {sql_file}")
         print(f"  3. Click 'Run'\n")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
         return False
 
 
@@ -66,7 +61,12 @@ def main():
         print()
         print("SQL to run:")
         print("-" * 80)
-        print(migration_file.read_text())
+        # Stream the file straight to stdout rather than decoding it into a str
+        sys.stdout.flush()
+        with open(migration_file, 'rb') as f:
+            shutil.copyfileobj(f, sys.stdout.buffer)
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
         print("-" * 80)
         print()
         print("✅ Copy the SQL above and run it in Supabase SQL Editor")
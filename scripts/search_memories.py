@@ -6,19 +6,29 @@ import asyncio
 import sys
 from typing import List, Dict, Any, Optional
 
-from openai import AsyncOpenAI
-from supabase import create_client, Client
-from config import config
-from utils import get_embedding
+from supabase import Client
+from app.clients import get_openai, get_supabase
+from utils import get_embedding, halfvec_param
 
 
 class MemorySearcher:
     """Simple memory search interface."""
 
+    _ROW_TMPL = (
+        "\n{i}. 📊 Similarity: {sim:.4f} | ⭐ Importance: {importance}/5\n"
+        "   💬 From: '{title}'\n"
+        "   👤 Role: {role}\n"
+        "{tags_line}"
+        "   📅 Date: {date}\n"
+        "\n   📝 Content:\n"
+        "   {preview}\n"
+        + "-" * 100 + "\n"
+    )
+
     def __init__(self):
-        """Initialize clients."""
-        self.openai_client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.supabase: Client = create_client(config.supabase_url, config.supabase_key)
+        """Attach the shared clients."""
+        self.openai_client = get_openai()
+        self.supabase: Client = get_supabase()
 
     async def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for memories similar to the query."""
@@ -33,7 +43,7 @@ class MemorySearcher:
         # Search using Supabase RPC function
         try:
             result = self.supabase.rpc('match_memories', {
-                'query_embedding': query_embedding,
+                'query_embedding': halfvec_param(query_embedding),
                 'match_count': limit
             }).execute()
             
@@ -44,29 +54,28 @@ class MemorySearcher:
             print(f"\n✅ Found {len(result.data)} results:\n")
             print("=" * 100)
             
+            rows = []
             for i, memory in enumerate(result.data, 1):
-                similarity = memory.get('similarity', 0)
                 content = memory.get('content', '')
                 metadata = memory.get('metadata', {})
                 tags = memory.get('tags', [])
-                importance = memory.get('importance', 0)
                 created = memory.get('created_at', '')
                 
-                # Extract conversation info from metadata
-                conv_title = metadata.get('conversation_title', 'Unknown')
-                role = metadata.get('role', 'unknown')
-                
-                print(f"\n{i}. 📊 Similarity: {similarity:.4f} | ⭐ Importance: {importance}/5")
-                print(f"   💬 From: '{conv_title}'")
-                print(f"   👤 Role: {role}")
-                if tags:
-                    print(f"   🏷️  Tags: {', '.join(tags)}")
-                print(f"   📅 Date: {created[:10] if created else 'Unknown'}")
-                print(f"\n   📝 Content:")
-                # Show first 300 chars
-                content_preview = content[:300] + "..." if len(content) > 300 else content
-                print(f"   {content_preview}")
-                print("-" * 100)
+                rows.append(self._ROW_TMPL.format(
+                    i=i,
+                    sim=memory.get('similarity', 0),
+                    importance=memory.get('importance', 0),
+                    # Extract conversation info from metadata
+                    title=metadata.get('conversation_title', 'Unknown'),
+                    role=metadata.get('role', 'unknown'),
+                    tags_line=f"   🏷️  Tags: {', '.join(tags)}\n" if tags else "",
+                    date=created[:10] if created else 'Unknown',
+                    # Show first 300 chars
+                    preview=content[:300] + "..." if len(content) > 300 else content
+                ))
+            
+            # One write for all rows instead of several prints per row
+            sys.stdout.write("".join(rows))
             
             return result.data
             
@@ -93,7 +102,7 @@ async def main():
     
     try:
         searcher = MemorySearcher()
-        await searcher.search(args.query, args.limit)
+        await searcher.search(args.query.strip(), args.limit)
     except KeyboardInterrupt:
         print("\n\n⏹️  Search cancelled")
         sys.exit(0)
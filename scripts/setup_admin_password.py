@@ -2,13 +2,31 @@
 """
 Setup script to generate admin password hash for authentication.
 Run this once to set up your admin password.
+
+With --prehash the password is SHA-256 hashed and base64 encoded before bcrypt,
+so passwords longer than bcrypt's 72-byte limit are not silently truncated. The
+code that verifies ADMIN_PASSWORD_HASH must apply the same transform:
+bcrypt.checkpw(prehash_password(password), stored_hash).
 """
 
+import argparse
+import base64
 import bcrypt
 import getpass
 import os
+from hashlib import sha256
+
+from generate_password_hash import bcrypt_rounds
+
+DEFAULT_ROUNDS = 12
+# bcrypt rejects passwords longer than 72 bytes (older releases silently truncated them)
+BCRYPT_MAX_BYTES = 72
+
+def prehash_password(password: str) -> bytes:
+    """SHA-256 the password and base64 it, giving 44 bytes with no NULs for bcrypt."""
+    return base64.b64encode(sha256(password.encode('utf-8')).digest())
 
-def generate_password_hash():
+def generate_password_hash(rounds: int = DEFAULT_ROUNDS, prehash: bool = False):
     """Generate a secure password hash for the admin user."""
     print("Setting up admin password for Sparky web interface")
     print("=" * 50)
@@ -24,15 +42,25 @@ def generate_password_hash():
         if len(password) < 8:
             print("Password must be at least 8 characters long. Please try again.\n")
             continue
+        
+        # The prehash is always 44 bytes, so only raw passwords can hit the limit
+        if not prehash and len(password.encode('utf-8')) > BCRYPT_MAX_BYTES:
+            print(f"❌ Password is longer than {BCRYPT_MAX_BYTES} bytes, which bcrypt cannot hash. "
+                  "Use a shorter password or rerun with --prehash.\n")
+            continue
             
         break
     
+    password_bytes = prehash_password(password) if prehash else password.encode('utf-8')
+    
     # Generate password hash
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+    salt = bcrypt.gensalt(rounds=rounds)
+    password_hash = bcrypt.hashpw(password_bytes, salt)
     hash_string = password_hash.decode('utf-8')
     
     print("\nGenerated password hash:")
+    if prehash:
+        print("(SHA-256 prehashed: verify with bcrypt.checkpw(prehash_password(password), hash))")
     print(f'ADMIN_PASSWORD_HASH="{hash_string}"')
     print("\nAdd this line to your .env file")
     
@@ -46,5 +74,15 @@ def generate_password_hash():
     
     print("\nSetup complete! You can now start the server with authentication.")
 
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Set up the admin password hash')
+    parser.add_argument('--rounds', type=bcrypt_rounds, default=DEFAULT_ROUNDS,
+                        help=f'bcrypt cost factor (default: {DEFAULT_ROUNDS}; raise it on fast hardware)')
+    parser.add_argument('--prehash', action='store_true',
+                        help='SHA-256 prehash the password to lift the 72-byte limit (verifier must match)')
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    generate_password_hash()
\ No newline at end of file
+    args = parse_arguments()
+    generate_password_hash(rounds=args.rounds, prehash=args.prehash)
\ No newline at end of file
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Keep a warm memory-search process behind a unix socket.
+
+Usage:
+    python scripts/sparky_daemon.py serve             # start the daemon
+    python scripts/sparky_daemon.py search "query"    # ask the running daemon
+
+The daemon pays for imports, client construction and connection setup once;
+each search then costs one embedding call and one match_memories RPC. Queries
+that arrive together are embedded in a single batched OpenAI request.
+
+Protocol: the client sends one JSON line such as
+{"op": "search", "query": "...", "limit": 3} and reads one JSON line back.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+SOCKET_PATH = Path.home() / ".sparky.sock"
+
+
+class SparkyDaemon:
+    """Serve memory searches from one long-lived MemoryRetriever."""
+
+    def __init__(self, socket_path: Path = SOCKET_PATH) -> None:
+        # Heavy imports happen here, once per daemon rather than once per query
+        from app.config import parse_tags
+        from retrieve_similar import MemoryRetriever
+        from utils import get_embedding
+
+        self.parse_tags = parse_tags
+        self.get_embedding = get_embedding
+        self.socket_path = socket_path
+        self.retriever = MemoryRetriever()
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request and return the JSON-serialisable response."""
+        op = request.get('op')
+        if op == 'ping':
+            return {"ok": True}
+        if op != 'search':
+            return {"ok": False, "error": f"Unknown op: {op}"}
+
+        query = (request.get('query') or '').strip()
+        if not query:
+            return {"ok": False, "error": "Query cannot be empty"}
+
+        # Concurrent queries on the shared client are embedded in one batched request
+        embedding = await self.get_embedding(query, self.retriever.openai_client)
+        # The Supabase query blocks, so keep it off the loop serving every client
+        memories = await asyncio.to_thread(
+            self.retriever.find_similar_memories,
+            embedding,
+            request.get('limit', 3),
+            request.get('type'),
+            self.parse_tags(request.get('tags')) or None,
+            request.get('importance_min'),
+            request.get('project_id')
+        )
+        text = self.retriever.format_rows(memories)
+        return {"ok": True, "results": memories, "text": text}
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """Answer each JSON line from a client connection."""
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response, default=str).encode('utf-8') + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Listen on the unix socket until interrupted."""
+        # A socket file left by a crashed daemon would make bind() fail
+        self.socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self.handle_client, path=str(self.socket_path))
+        self.socket_path.chmod(0o600)
+        print(f"🧠 Sparky daemon listening on {self.socket_path}")
+
+        async with server:
+            await server.serve_forever()
+
+
+async def send_request(request: Dict[str, Any], socket_path: Path = SOCKET_PATH) -> Dict[str, Any]:
+    """Send one request to the running daemon and return its response."""
+    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    try:
+        writer.write(json.dumps(request).encode('utf-8') + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Warm memory-search daemon and client')
+    parser.add_argument('--socket', type=Path, default=SOCKET_PATH,
+                        help=f'Unix socket path (default: {SOCKET_PATH})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('serve', help='Start the daemon')
+    search = commands.add_parser('search', help='Search memories through the running daemon')
+    search.add_argument('query', help='Search query')
+    search.add_argument('--limit', type=int, default=3, help='Maximum number of results (default: 3)')
+    search.add_argument('--type', help='Filter by memory type')
+    search.add_argument('--tags', help='Filter by comma-separated tags')
+    search.add_argument('--importance-min', type=int, help='Minimum importance level (1-5)')
+    search.add_argument('--project-id', help='Filter by project identifier')
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Run the daemon or the client, depending on the subcommand."""
+    args = parse_arguments()
+
+    if args.command == 'serve':
+        # Only the daemon needs the repo root on the path for its imports
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+        try:
+            asyncio.run(SparkyDaemon(args.socket).serve())
+        except KeyboardInterrupt:
+            print("\n⏹️  Sparky daemon stopped")
+        finally:
+            args.socket.unlink(missing_ok=True)
+        return 0
+
+    request = {
+        "op": "search",
+        "query": args.query,
+        "limit": args.limit,
+        "type": args.type,
+        "tags": args.tags,
+        "importance_min": args.importance_min,
+        "project_id": args.project_id
+    }
+    try:
+        response = asyncio.run(send_request(request, args.socket))
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ No daemon listening on {args.socket}; start one with: sparky_daemon.py serve")
+        return 1
+
+    if not response.get('ok'):
+        print(f"❌ Error: {response.get('error')}")
+        return 1
+    if not response['results']:
+        print("No similar memories found.")
+        return 0
+    print(f"🔍 Found {len(response['results'])} similar memories:")
+    print("=" * 80)
+    sys.stdout.write(response['text'])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,35 +3,82 @@
 
 import argparse
 import asyncio
-import json
+import mmap
 import os
 import signal
 import sys
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Dict, List, Optional, Union
 import hashlib
 
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import PatternMatchingEventHandler
 
-from load_memory_batch import BatchMemoryLoader
+from load_memory_batch import BatchMemoryLoader, dump_json_line, load_json, run_async
 from config import parse_tags, validate_importance
 
+# Files larger than this are hashed through a read-only memory map. Neither path copies
+# the whole file; both run at hashlib's BLAKE2b speed (~700 MB/s), which keeps change
+# detection dependency-free and is rarely reached thanks to the size/mtime fast path
+MMAP_HASH_THRESHOLD = 16 * 1024 * 1024
+# Files at least this large are hashed in a worker thread (hashlib releases the GIL),
+# so embedding requests for other files keep flowing meanwhile
+THREAD_HASH_THRESHOLD = 1024 * 1024
+# Entries written before the switch to BLAKE2b hold 32-char MD5 digests. A file whose
+# MD5 still matches gets its record rewritten with the current digest instead of
+# being ingested again
+MD5_HASH_LENGTH = 32
+# A file is queued once no event has arrived for it for this long
+SETTLE_SECONDS = 0.5
+# How often the processing loop checks for settled files
+POLL_INTERVAL = 0.25
+# Existing files processed concurrently at startup
+STARTUP_CONCURRENCY = 8
+# Files waiting for the processor; when full, settled files stay pending until there is room
+MAX_QUEUED_FILES = 256
+META_SUFFIX = '.meta.json'
+# The processed log is rewritten once it holds this many lines per tracked file
+LOG_COMPACT_FACTOR = 10
 
-class MemoryFileHandler(FileSystemEventHandler):
+
+def _blake2b_8():
+    """Return a fresh 64-bit BLAKE2b hasher (collisions are irrelevant at this scale)."""
+    return hashlib.blake2b(digest_size=8)
+
+
+class MemoryFileHandler(PatternMatchingEventHandler):
     """Handles file system events for memory ingestion."""
     
     def __init__(self, watch_folder: str, processed_log: str):
         """Initialize the file handler."""
         self.watch_folder = Path(watch_folder)
+        # Paths of files directly in the folder start with this; their key is the rest
+        self._watch_prefix = os.path.join(str(self.watch_folder), '')
         self.processed_log = Path(processed_log)
         self.supported_extensions = {'.txt', '.md', '.json'}
-        self.processing_queue = asyncio.Queue()
+        # str.endswith takes a tuple, checking every extension in one call
+        self._suffixes = tuple(self.supported_extensions)
+        # Let watchdog drop events for other files before they reach us; *.json also
+        # covers the .meta.json sidecars, whose events keep the metadata cache fresh
+        super().__init__(
+            patterns=[f"*{ext}" for ext in self.supported_extensions],
+            ignore_directories=True
+        )
+        self.processing_queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUED_FILES)
+        # Path -> monotonic time of its latest event; written by the observer thread
+        self._pending: Dict[Path, float] = {}
+        self._pending_lock = threading.Lock()
+        # Sidecar path -> parsed metadata, or None when an event means it must be re-read.
+        # Once primed, a sidecar missing from the cache is known not to exist
+        self.meta_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._meta_primed = False
         self.loader = BatchMemoryLoader()
         
-        # Load processed files log
+        # Load processed files log (one {file_key: record} JSON object per line)
+        self._log_lines = 0
         self.processed_files = self.load_processed_log()
         
         print(f"👁️  Watching folder: {self.watch_folder}")
@@ -39,59 +86,157 @@ class MemoryFileHandler(FileSystemEventHandler):
         print(f"📁 Supported extensions: {', '.join(self.supported_extensions)}")
     
     def load_processed_log(self) -> Dict[str, Dict[str, Any]]:
-        """Load the processed files log."""
-        if self.processed_log.exists():
+        """Load the processed files log; later lines for a file replace earlier ones."""
+        if not self.processed_log.exists():
+            return {}
+        try:
+            lines = self.processed_log.read_bytes().splitlines()
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load processed log: {e}")
+            return {}
+        
+        processed_files: Dict[str, Dict[str, Any]] = {}
+        bad_lines = 0
+        for line in lines:
+            if not line.strip():
+                continue
             try:
-                with open(self.processed_log, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"⚠️  Warning: Could not load processed log: {e}")
-                return {}
-        return {}
+                processed_files.update(load_json(line))
+                self._log_lines += 1
+            except (ValueError, TypeError):
+                bad_lines += 1
+        
+        if bad_lines:
+            try:
+                # A single indented JSON document written before the append-only log
+                processed_files = load_json(b'\n'.join(lines))
+                print("📋 Converting processed log to append-only format")
+            except ValueError:
+                # An interrupted append leaves a torn line; keep everything else
+                print(f"⚠️  Warning: Skipped {bad_lines} unreadable processed log lines")
+            self.processed_files = processed_files
+            self.save_processed_log()
+        return processed_files
     
     def save_processed_log(self) -> None:
-        """Save the processed files log."""
+        """Rewrite the processed files log with one line per tracked file."""
         try:
             # Ensure directory exists
             self.processed_log.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(self.processed_log, 'w', encoding='utf-8') as f:
-                json.dump(self.processed_files, f, indent=2, default=str)
+            tmp_path = self.processed_log.with_name(self.processed_log.name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.writelines(
+                    dump_json_line({file_key: record})
+                    for file_key, record in self.processed_files.items()
+                )
+            os.replace(tmp_path, self.processed_log)
+            self._log_lines = len(self.processed_files)
         except Exception as e:
             print(f"❌ Error saving processed log: {e}")
     
-    def get_file_hash(self, filepath: Path) -> str:
-        """Get MD5 hash of file content for change detection."""
+    def record_processed(self, file_key: str, record: Dict[str, Any]) -> None:
+        """Store a file's record and append it to the log, compacting when it grows."""
+        self.processed_files[file_key] = record
+        if self._log_lines >= LOG_COMPACT_FACTOR * len(self.processed_files):
+            self.save_processed_log()
+            return
+        try:
+            self.processed_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.processed_log, 'ab') as f:
+                f.write(dump_json_line({file_key: record}))
+            self._log_lines += 1
+        except Exception as e:
+            print(f"❌ Error saving processed log: {e}")
+    
+    def get_file_hash(self, filepath: Union[str, Path], legacy: bool = False) -> str:
+        """Get a BLAKE2b-64 hash of file content for change detection (MD5 if legacy)."""
+        new_hasher = hashlib.md5 if legacy else _blake2b_8
         try:
             with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                if os.fstat(f.fileno()).st_size > MMAP_HASH_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        hasher = new_hasher()
+                        hasher.update(mm)
+                        return hasher.hexdigest()
+                # file_digest streams through a reused buffer with readinto
+                return hashlib.file_digest(f, new_hasher).hexdigest()
         except Exception:
             return ""
     
-    def should_process_file(self, filepath: Path) -> bool:
+    def file_key(self, filepath: Union[str, Path]) -> str:
+        """Return the processed-log key for a file: its path relative to the watch folder."""
+        path = os.fspath(filepath)
+        if path.startswith(self._watch_prefix):
+            return path[len(self._watch_prefix):]
+        return str(Path(path).relative_to(self.watch_folder))
+    
+    def should_process_file(self, filepath: Union[str, Path]) -> bool:
         """Check if file should be processed."""
-        # Check extension
-        if filepath.suffix.lower() not in self.supported_extensions:
-            return False
+        # Plain string operations: this runs for every event and every file at startup
+        path = os.fspath(filepath)
         
-        # Skip metadata files
-        if filepath.name.endswith('.meta.json'):
+        # Check extension, skipping metadata files
+        if not path.lower().endswith(self._suffixes) or path.endswith(META_SUFFIX):
             return False
         
         # Check if already processed
-        file_key = str(filepath.relative_to(self.watch_folder))
-        current_hash = self.get_file_hash(filepath)
+        file_key = self.file_key(path)
+        record = self.processed_files.get(file_key)
+        if record is None:
+            return True
         
-        if file_key in self.processed_files:
-            stored_hash = self.processed_files[file_key].get('hash', '')
-            if stored_hash == current_hash:
-                return False  # File unchanged
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        
+        # Same size and mtime as when it was processed: unchanged, no need to read it
+        if record.get('size') == stat.st_size and record.get('mtime_ns') == stat.st_mtime_ns:
+            return False
+        
+        stored_hash = record.get('hash', '')
+        legacy = len(stored_hash) == MD5_HASH_LENGTH
+        if stored_hash == self.get_file_hash(path, legacy=legacy):
+            # Touched but not changed; remember the current digest and stat so the
+            # next check is O(1)
+            if legacy:
+                record['hash'] = self.get_file_hash(path)
+            record['size'] = stat.st_size
+            record['mtime_ns'] = stat.st_mtime_ns
+            self.record_processed(file_key, record)
+            return False  # File unchanged
         
         return True
     
+    def prime_meta_cache(self) -> None:
+        """Parse every .meta.json in the watch folder once; later lookups skip the disk."""
+        with os.scandir(self.watch_folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(META_SUFFIX) and entry.is_file():
+                    self.meta_cache[entry.path] = None
+        self._meta_primed = True
+        for meta_path in list(self.meta_cache):
+            self._read_meta(meta_path)
+    
+    def _read_meta(self, meta_path: str) -> Optional[Dict[str, Any]]:
+        """Parse a sidecar from disk, caching the result once the cache is primed."""
+        try:
+            meta_data = load_json(Path(meta_path).read_bytes())
+        except FileNotFoundError:
+            self.meta_cache.pop(meta_path, None)
+            return None
+        except Exception as e:
+            # Left uncached, so a fixed file is picked up on the next lookup
+            print(f"⚠️  Warning: Could not load metadata from {meta_path}: {e}")
+            return None
+        if self._meta_primed:
+            self.meta_cache[meta_path] = meta_data
+        return meta_data
+    
     def load_metadata(self, filepath: Path) -> Dict[str, Any]:
         """Load metadata from .meta.json file if it exists."""
-        meta_file = filepath.with_suffix(filepath.suffix + '.meta.json')
+        meta_path = os.fspath(filepath) + META_SUFFIX
         
         # Default metadata
         metadata = {
@@ -100,11 +245,15 @@ class MemoryFileHandler(FileSystemEventHandler):
             'importance': 1
         }
         
-        if meta_file.exists():
+        if self._meta_primed and meta_path not in self.meta_cache:
+            return metadata
+        meta_data = self.meta_cache.get(meta_path)
+        if meta_data is None:
+            meta_data = self._read_meta(meta_path)
+        
+        if meta_data is not None:
+            meta_file = Path(meta_path)
             try:
-                with open(meta_file, 'r', encoding='utf-8') as f:
-                    meta_data = json.load(f)
-                    
                 # Update with loaded metadata
                 if 'source' in meta_data:
                     metadata['source'] = meta_data['source']
@@ -128,42 +277,74 @@ class MemoryFileHandler(FileSystemEventHandler):
     
     def on_created(self, event):
         """Handle file creation events."""
-        if not event.is_directory:
-            self.queue_file_for_processing(Path(event.src_path))
+        self.note_event(event.src_path)
     
     def on_modified(self, event):
         """Handle file modification events."""
-        if not event.is_directory:
-            self.queue_file_for_processing(Path(event.src_path))
+        self.note_event(event.src_path)
+    
+    def on_deleted(self, event):
+        """Forget deleted metadata files."""
+        if event.src_path.endswith(META_SUFFIX):
+            self.meta_cache.pop(event.src_path, None)
+    
+    def on_moved(self, event):
+        """Track metadata files saved by rename, as many editors do."""
+        self.on_deleted(event)
+        if event.dest_path.endswith(META_SUFFIX):
+            self.meta_cache[event.dest_path] = None
+    
+    def note_event(self, path: str):
+        """Mark a sidecar stale, or a content file pending."""
+        if path.endswith(META_SUFFIX):
+            self.meta_cache[path] = None
+        else:
+            self.mark_pending(Path(path))
+    
+    def mark_pending(self, filepath: Path):
+        """Note an event for a file; it is only examined once its writes settle."""
+        with self._pending_lock:
+            self._pending[filepath] = time.monotonic()
+    
+    def pop_settled(self, quiet_period: float = SETTLE_SECONDS) -> List[Path]:
+        """Remove and return pending files with no events for quiet_period seconds."""
+        cutoff = time.monotonic() - quiet_period
+        with self._pending_lock:
+            settled = [path for path, last_event in self._pending.items() if last_event <= cutoff]
+            for path in settled:
+                del self._pending[path]
+        return settled
     
     def queue_file_for_processing(self, filepath: Path):
-        """Queue a file for processing."""
-        if self.should_process_file(filepath):
-            print(f"📥 Queuing file for processing: {filepath.name}")
-            # Use asyncio.create_task to add to queue from sync context
+        """Queue a file for processing (called from the event loop)."""
+        if filepath.exists() and self.should_process_file(filepath):
             try:
-                loop = asyncio.get_event_loop()
-                loop.create_task(self.processing_queue.put(filepath))
-            except RuntimeError:
-                # If no event loop is running, we'll handle this in the main loop
-                pass
+                self.processing_queue.put_nowait(filepath)
+            except asyncio.QueueFull:
+                # Back-pressure: check the file again on a later tick
+                self.mark_pending(filepath)
+                return
+            print(f"📥 Queuing file for processing: {filepath.name}")
     
     async def process_file_async(self, filepath: Path) -> bool:
         """Process a single file asynchronously."""
         try:
             print(f"\n🔄 Processing: {filepath.name}")
+            file_key = self.file_key(filepath)
             
             # Load metadata
             metadata = self.load_metadata(filepath)
             
-            # Reset loader statistics for this file
-            self.loader.total_chunks = 0
-            self.loader.successful_inserts = 0
-            self.loader.failed_inserts = 0
-            self.loader.skipped_chunks = 0
+            # Fingerprint the file before reading it, so edits made during processing
+            # still count as changes
+            stat = filepath.stat()
+            if stat.st_size >= THREAD_HASH_THRESHOLD:
+                file_hash = await asyncio.to_thread(self.get_file_hash, filepath)
+            else:
+                file_hash = self.get_file_hash(filepath)
             
-            # Process the file
-            await self.loader.process_file(
+            # Process the file; the loader is shared, so use this file's own counts
+            stats = await self.loader.process_file(
                 filepath=str(filepath),
                 source=metadata['source'],
                 tags=metadata['tags'] if metadata['tags'] else None,
@@ -171,23 +352,22 @@ class MemoryFileHandler(FileSystemEventHandler):
             )
             
             # Update processed files log
-            file_key = str(filepath.relative_to(self.watch_folder))
-            self.processed_files[file_key] = {
+            self.record_processed(file_key, {
                 'processed_at': datetime.now().isoformat(),
-                'hash': self.get_file_hash(filepath),
-                'chunks': self.loader.successful_inserts,
+                'hash': file_hash,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'chunks': stats['successful'],
                 'source': metadata['source'],
                 'tags': metadata['tags'],
                 'importance': metadata['importance']
-            }
-            
-            self.save_processed_log()
+            })
             
             print(f"✅ Successfully processed {filepath.name}")
-            print(f"   Chunks stored: {self.loader.successful_inserts}")
-            print(f"   Failed: {self.loader.failed_inserts}")
+            print(f"   Chunks stored: {stats['successful']}")
+            print(f"   Failed: {stats['failed']}")
             
-            return self.loader.failed_inserts == 0
+            return stats['failed'] == 0
             
         except Exception as e:
             print(f"❌ Error processing {filepath.name}: {e}")
@@ -205,18 +385,20 @@ class MemoryWatcher:
         self.handler = MemoryFileHandler(str(self.watch_folder), str(self.processed_log))
         self.observer = Observer()
         self.running = False
+        self._main_task: Optional[asyncio.Task] = None
         
         # Ensure watch folder exists
         self.watch_folder.mkdir(exist_ok=True)
-        
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
     
-    def signal_handler(self, signum, frame):
-        """Handle shutdown signals."""
+    def request_shutdown(self, signum: int):
+        """Handle shutdown signals on the event loop; a second signal stops immediately."""
+        if not self.running:
+            print(f"\n🛑 Received signal {signum} again, stopping now...")
+            if self._main_task is not None:
+                self._main_task.cancel()
+            return
         print(f"\n🛑 Received signal {signum}, shutting down gracefully...")
-        self.stop()
+        self.running = False
     
     def start(self):
         """Start watching for files."""
@@ -230,11 +412,10 @@ class MemoryWatcher:
         self.observer.start()
         self.running = True
         
-        # Process any existing files first
-        asyncio.run(self.process_existing_files())
-        
-        # Start the main processing loop
-        asyncio.run(self.processing_loop())
+        try:
+            run_async(self.run())
+        except asyncio.CancelledError:
+            pass
     
     def stop(self):
         """Stop the watcher."""
@@ -244,19 +425,44 @@ class MemoryWatcher:
             self.observer.join()
         print("👋 Memory Watcher stopped")
     
+    async def run(self):
+        """Process existing files, then watch for new ones, on one event loop."""
+        loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.request_shutdown, signum)
+        try:
+            self.handler.prime_meta_cache()
+            await self.process_existing_files()
+            if self.running:
+                await self.processing_loop()
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+            await self.handler.loader.close()
+            # Joining the observer thread blocks, so keep it off the event loop
+            await asyncio.to_thread(self.stop)
+    
     async def process_existing_files(self):
         """Process any existing files in the watch folder."""
         print("🔍 Checking for existing files...")
         
-        existing_files = []
-        for filepath in self.watch_folder.iterdir():
-            if filepath.is_file() and self.handler.should_process_file(filepath):
-                existing_files.append(filepath)
+        # scandir reports the entry type without a stat call per file
+        with os.scandir(self.watch_folder) as entries:
+            existing_files = [
+                Path(entry.path) for entry in entries
+                if entry.is_file() and self.handler.should_process_file(entry.path)
+            ]
         
         if existing_files:
             print(f"📁 Found {len(existing_files)} existing files to process")
-            for filepath in existing_files:
-                await self.handler.process_file_async(filepath)
+            semaphore = asyncio.Semaphore(STARTUP_CONCURRENCY)
+            
+            async def process_one(filepath: Path) -> bool:
+                async with semaphore:
+                    return await self.handler.process_file_async(filepath)
+            
+            await asyncio.gather(*(process_one(filepath) for filepath in existing_files))
         else:
             print("📭 No existing files to process")
     
@@ -266,11 +472,15 @@ class MemoryWatcher:
         
         while self.running:
             try:
+                # Files whose event burst has settled are checked once and queued
+                for filepath in self.handler.pop_settled():
+                    self.handler.queue_file_for_processing(filepath)
+                
                 # Check for queued files (with timeout to allow checking self.running)
                 try:
                     filepath = await asyncio.wait_for(
                         self.handler.processing_queue.get(), 
-                        timeout=1.0
+                        timeout=POLL_INTERVAL
                     )
                     await self.handler.process_file_async(filepath)
                 except asyncio.TimeoutError:
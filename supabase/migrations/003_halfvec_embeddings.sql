@@ -0,0 +1,49 @@
+-- Store embeddings as half-precision vectors (requires pgvector >= 0.7)
+-- halfvec halves row size and index pages read per match_memories call
+
+-- The ivfflat index is tied to the column type, so rebuild it afterwards
+drop index if exists structured_memory_embedding_idx;
+
+alter table structured_memory
+  alter column embedding type halfvec(1536) using embedding::halfvec(1536);
+
+create index if not exists structured_memory_embedding_idx
+  on structured_memory using ivfflat (embedding halfvec_cosine_ops);
+
+-- Recreate match_memories against the halfvec column
+-- Callers still send a plain JSON float array; PostgREST casts it on input
+drop function if exists match_memories(vector, int);
+
+create or replace function match_memories(
+  query_embedding halfvec(1536),
+  match_count int default 5
+)
+returns table (
+  id uuid,
+  content text,
+  type text,
+  tags text[],
+  source text,
+  importance integer,
+  metadata jsonb,
+  project_id text,
+  created_at timestamp with time zone,
+  similarity float
+)
+language sql stable
+as $$
+  select
+    m.id,
+    m.content,
+    m.type,
+    m.tags,
+    m.source,
+    m.importance,
+    m.metadata,
+    m.project_id,
+    m.created_at,
+    1 - (m.embedding <=> query_embedding) as similarity
+  from structured_memory m
+  order by m.embedding <=> query_embedding
+  limit match_count;
+$$;
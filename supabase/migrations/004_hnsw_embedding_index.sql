@@ -0,0 +1,47 @@
+-- Replace the ivfflat embedding index with HNSW
+-- HNSW gives better recall/latency for small top-k queries and needs no training lists
+drop index if exists structured_memory_embedding_idx;
+
+create index if not exists structured_memory_embedding_idx
+  on structured_memory using hnsw (embedding halfvec_cosine_ops);
+
+-- Scale the HNSW candidate list with the requested result count on every call
+create or replace function match_memories(
+  query_embedding halfvec(1536),
+  match_count int default 5
+)
+returns table (
+  id uuid,
+  content text,
+  type text,
+  tags text[],
+  source text,
+  importance integer,
+  metadata jsonb,
+  project_id text,
+  created_at timestamp with time zone,
+  similarity float
+)
+language plpgsql stable
+as $$
+begin
+  -- Equivalent to SET LOCAL: only applies to the current transaction
+  perform set_config('hnsw.ef_search', greatest(match_count * 4, 40)::text, true);
+
+  return query
+  select
+    m.id,
+    m.content,
+    m.type,
+    m.tags,
+    m.source,
+    m.importance,
+    m.metadata,
+    m.project_id,
+    m.created_at,
+    (1 - (m.embedding <=> query_embedding))::float as similarity
+  from structured_memory m
+  order by m.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
@@ -0,0 +1,61 @@
+"""Shared pytest fixtures for the Sparky test scripts.
+
+API clients are created once per test session, so every test that talks to
+OpenAI or Supabase reuses one connection pool instead of opening its own. The
+fixtures and tests all run on the session-wide event loop (see pytest.ini).
+"""
+
+import pytest
+import pytest_asyncio
+
+from app.clients import get_openai, get_supabase
+from utils import get_embedding
+
+
+def pytest_configure(config):
+    """Register the custom markers and skip slow tests unless -m asks for them."""
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run tests with the same name on one xdist worker"
+    )
+    config.addinivalue_line("markers", "slow: network/file-watcher heavy")
+    # Default dev loop stays fast; CI runs the slow job with -m slow
+    if not config.option.markexpr:
+        config.option.markexpr = "not slow"
+
+
+@pytest_asyncio.fixture(scope="session")
+async def openai_client():
+    """Session-wide AsyncOpenAI client (see app.clients.get_openai), closed at the end."""
+    client = get_openai()
+    yield client
+    await client.close()
+    # Later get_openai() calls in this process must not hand out the closed client
+    get_openai.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def supabase_client():
+    """Session-wide Supabase client (see app.clients.get_supabase)."""
+    return get_supabase()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def warmup_embedding(openai_client):
+    """One real embedding, fetched once and shared by tests that need any vector."""
+    # The text lives in the connectivity script, which also runs without pytest
+    from test_connectivity import WARMUP_TEXT
+    return await get_embedding(WARMUP_TEXT, openai_client)
+
+
+@pytest.fixture(scope="session")
+def injector(openai_client, supabase_client):
+    """Session-wide MemoryInjector on the shared clients."""
+    from inject_memory import MemoryInjector
+    return MemoryInjector()
+
+
+@pytest.fixture(scope="session")
+def retriever(openai_client, supabase_client):
+    """Session-wide MemoryRetriever on the shared clients."""
+    from retrieve_similar import MemoryRetriever
+    return MemoryRetriever()
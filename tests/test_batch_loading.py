@@ -3,7 +3,6 @@
 
 import asyncio
 import tempfile
-import os
 from pathlib import Path
 
 from load_memory_batch import BatchMemoryLoader
@@ -42,49 +41,38 @@ This content should be split into multiple chunks based on the ~500 token limit.
 Each chunk will be processed separately and stored in the database.
 """
     
-    # Create temporary test file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8') as f:
-        f.write(test_content)
-        temp_file = f.name
-    
     try:
-        print(f"📁 Created test file: {temp_file}")
-        
         # Initialize loader
         loader = BatchMemoryLoader()
         
-        # Test text chunking
+        # Test text chunking (pure string work, no file needed)
         print("\n🔪 Testing text chunking...")
-        chunks = loader.chunk_text(test_content)
+        chunks = loader.chunk_text_with_tokens(test_content)
         print(f"Split into {len(chunks)} chunks:")
         
-        for i, chunk in enumerate(chunks, 1):
-            token_count = loader.count_tokens(chunk)
+        for i, (chunk, token_count) in enumerate(chunks, 1):
             print(f"  Chunk {i}: {len(chunk)} chars, ~{token_count} tokens")
             print(f"    Preview: {chunk[:100]}...")
         
-        # Test source detection
+        # Test source detection (only looks at the file name)
         print(f"\n🏷️  Testing source detection...")
-        detected_source = loader.detect_source_from_filename(temp_file)
+        detected_source = loader.detect_source_from_filename("test_notes.md")
         print(f"Detected source: {detected_source}")
         
-        # Test file reading
+        # Test file reading; the only step that needs a real file
         print(f"\n📄 Testing file reading...")
-        content = loader.read_file_content(temp_file)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_file = Path(temp_dir) / "test_document.md"
+            temp_file.write_text(test_content, encoding='utf-8')
+            content = loader.read_file_content(str(temp_file))
         print(f"Read {len(content)} characters")
         
         print("\n✅ All tests passed!")
         print("Note: To test full database integration, run:")
-        print(f"python load_memory_batch.py {temp_file} --tags='test,batch' --importance=1")
+        print("python load_memory_batch.py <file.md> --tags='test,batch' --importance=1")
         
     except Exception as e:
         print(f"❌ Test failed: {e}")
-    finally:
-        # Clean up
-        if os.path.exists(temp_file):
-            os.unlink(temp_file)
-            print(f"🗑️  Cleaned up test file")
-
 
 if __name__ == "__main__":
     asyncio.run(test_batch_loading())
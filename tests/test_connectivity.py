@@ -3,56 +3,45 @@
 
 import asyncio
 import sys
+from typing import List
+
+import pytest
 from config import config
-from helpers import get_embedding
-from supabase import create_client, Client
-from openai import AsyncOpenAI
+from utils import get_embedding
+from supabase import Client
+
+from app.clients import get_openai, get_supabase
+
+# Embedded once per session; conftest's warmup_embedding fixture shares the vector
+WARMUP_TEXT = "This is a test for connectivity validation."
 
 
-async def test_openai_connectivity():
-    """Test OpenAI API connectivity."""
+@pytest.mark.xdist_group("supabase")
+async def test_openai_connectivity(warmup_embedding: List[float]):
+    """Test OpenAI API connectivity using the session's warm-up embedding."""
     print("Testing OpenAI API connectivity...")
     
-    try:
-        client = AsyncOpenAI(api_key=config.openai_api_key)
-        test_text = "This is a test for connectivity validation."
-        embedding = await get_embedding(test_text, client)
-        
-        if len(embedding) == config.embedding_dimensions:
-            print(f"✅ OpenAI API working - generated {len(embedding)}D embedding")
-            return True
-        else:
-            print(f"❌ Embedding dimension mismatch: got {len(embedding)}, expected {config.embedding_dimensions}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ OpenAI API test failed: {e}")
-        return False
+    embedding = warmup_embedding
+    assert len(embedding) == config.embedding_dimensions, (
+        f"Embedding dimension mismatch: got {len(embedding)}, expected {config.embedding_dimensions}"
+    )
+    print(f"✅ OpenAI API working - generated {len(embedding)}D embedding")
 
 
-def test_supabase_connectivity():
+@pytest.mark.xdist_group("supabase")
+def test_supabase_connectivity(supabase_client: Client):
     """Test Supabase database connectivity."""
     print("Testing Supabase database connectivity...")
     
-    try:
-        # Create Supabase client
-        supabase: Client = create_client(config.supabase_url, config.supabase_key)
-        
-        # Test basic connectivity with a simple query
-        response = supabase.table(config.memory_table).select("count", count="exact").limit(1).execute()
-        
-        print(f"✅ Database connection successful")
-        print(f"✅ Memory table '{config.memory_table}' accessible")
-        
-        # Check if table has data
-        if hasattr(response, 'count') and response.count is not None:
-            print(f"✅ Table contains {response.count} records")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ Database connectivity test failed: {e}")
-        return False
+    # Test basic connectivity with a simple query; any error fails the test
+    response = supabase_client.table(config.memory_table).select("count", count="exact").limit(1).execute()
+    
+    print(f"✅ Database connection successful")
+    print(f"✅ Memory table '{config.memory_table}' accessible")
+    
+    # Check if table has data
+    if hasattr(response, 'count') and response.count is not None:
+        print(f"✅ Table contains {response.count} records")
 
 
 async def main():
@@ -61,12 +50,23 @@ async def main():
     print("=" * 50)
     
     # Test OpenAI
-    openai_ok = await test_openai_connectivity()
+    try:
+        embedding = await get_embedding(WARMUP_TEXT, get_openai())
+        await test_openai_connectivity(embedding)
+        openai_ok = True
+    except Exception as e:
+        print(f"❌ OpenAI API test failed: {e}")
+        openai_ok = False
     
     print()
     
     # Test Supabase
-    supabase_ok = test_supabase_connectivity()
+    try:
+        test_supabase_connectivity(get_supabase())
+        supabase_ok = True
+    except Exception as e:
+        print(f"❌ Database connectivity test failed: {e}")
+        supabase_ok = False
     
     print("\n" + "=" * 50)
     
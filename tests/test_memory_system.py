@@ -3,19 +3,20 @@
 
 import asyncio
 import sys
+
+import pytest
 from inject_memory import MemoryInjector
 from retrieve_similar import MemoryRetriever
+from utils import get_embeddings
 
 
-async def test_memory_system():
+@pytest.mark.slow
+@pytest.mark.xdist_group("openai")
+async def test_memory_system(injector: MemoryInjector, retriever: MemoryRetriever):
     """Test the enhanced memory system with sample data."""
     print("🧪 Testing Enhanced AI Memory System")
     print("=" * 50)
     
-    # Initialize components
-    injector = MemoryInjector()
-    retriever = MemoryRetriever()
-    
     # Test data with different types and metadata
     test_memories = [
         {
@@ -51,22 +52,28 @@ async def test_memory_system():
     print("📝 Injecting test memories...")
     stored_memories = []
     
-    for i, memory in enumerate(test_memories, 1):
+    # Embed every test memory in one request, then store them one by one
+    embeddings = await get_embeddings(
+        [memory["content"] for memory in test_memories], injector.openai_client
+    )
+    assert len(embeddings) == len(test_memories)
+    
+    for i, (memory, embedding) in enumerate(zip(test_memories, embeddings), 1):
         print(f"\n{i}. Storing: {memory['content'][:40]}...")
-        try:
-            result = await injector.inject_memory(
-                memory_text=memory["content"],
-                memory_type=memory["type"],
-                tags=memory["tags"],
-                source=memory["source"],
-                importance=memory["importance"]
-            )
-            stored_memories.append(result)
-            print(f"   ✅ Stored with ID: {result.get('id')}")
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+        result = await injector.store_memory(
+            memory["content"],
+            embedding,
+            memory_type=memory["type"],
+            tags=memory["tags"],
+            source=memory["source"],
+            importance=memory["importance"]
+        )
+        assert result.get('id') is not None, f"No id returned for: {memory['content']}"
+        stored_memories.append(result)
+        print(f"   ✅ Stored with ID: {result.get('id')}")
     
     print(f"\n📊 Successfully stored {len(stored_memories)} memories")
+    injected = {memory["content"] for memory in test_memories}
     
     # Test retrieval with different filters
     print("\n" + "=" * 50)
@@ -96,21 +103,20 @@ async def test_memory_system():
         print(f"   Filters: {test['filters']}")
         print("-" * 40)
         
-        try:
-            await retriever.retrieve_similar(
-                query=test["query"],
-                limit=2,
-                **test["filters"]
-            )
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+        results = await retriever.retrieve_similar(
+            query=test["query"],
+            limit=2,
+            **test["filters"]
+        )
+        assert any(row.get('content') in injected for row in results), \
+            f"No injected memory found for '{test['query']}'"
     
     print("\n🎉 Test completed!")
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(test_memory_system())
+        asyncio.run(test_memory_system(MemoryInjector(), MemoryRetriever()))
     except KeyboardInterrupt:
         print("\n⏹️  Test interrupted by user")
         sys.exit(0)
@@ -9,10 +9,11 @@ print(f"URL: {config.supabase_url}")
 
 try:
     client = create_client(config.supabase_url, config.supabase_key)
-    result = client.table(config.memory_table).select("*").limit(1).execute()
+    # HEAD request with an exact count: proves access without transferring any rows
+    result = client.table(config.memory_table).select("*", count="exact", head=True).execute()
     print(f"✅ Supabase is accessible!")
     print(f"   Table: {config.memory_table}")
-    print(f"   Records found: {len(result.data)}")
+    print(f"   Records found: {result.count}")
 except Exception as e:
     print(f"❌ Supabase error: {e}")
     print(f"\n💡 Possible issues:")
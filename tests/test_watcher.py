@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 """Comprehensive test suite for the file watcher functionality."""
 
-import asyncio
-import json
+import hashlib
 import os
 import shutil
 import tempfile
@@ -12,17 +11,37 @@ from typing import Dict, Any
 import unittest
 from unittest.mock import patch, AsyncMock
 
+import orjson
+
 from watch_and_load import MemoryWatcher, MemoryFileHandler
 from load_memory_batch import BatchMemoryLoader
 
+# Scratch files go to RAM-backed /dev/shm where it exists, else the default temp dir
+SCRATCH_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+class ScratchDirTestCase(unittest.IsolatedAsyncioTestCase):
+    """Gives each test class one scratch tree, removed once after its last test."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Create the class's scratch directory."""
+        cls.class_dir = Path(tempfile.mkdtemp(dir=SCRATCH_ROOT))
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the scratch directory and every test's files in it."""
+        shutil.rmtree(cls.class_dir, ignore_errors=True)
+        print("🗑️  Test cleanup complete")
+
 
-class TestFileWatcher(unittest.TestCase):
+class TestFileWatcher(ScratchDirTestCase):
     """Test cases for the file watcher system."""
     
     def setUp(self):
         """Set up test environment."""
-        # Create temporary directories for testing
-        self.test_dir = Path(tempfile.mkdtemp())
+        # Each test gets its own directory inside the class's scratch tree
+        self.test_dir = Path(tempfile.mkdtemp(dir=self.class_dir))
         self.watch_folder = self.test_dir / "test-memory-drops"
         self.processed_log = self.test_dir / "test_processed_files.json"
         
@@ -33,25 +52,17 @@ class TestFileWatcher(unittest.TestCase):
         print(f"   Watch folder: {self.watch_folder}")
         print(f"   Processed log: {self.processed_log}")
     
-    def tearDown(self):
-        """Clean up test environment."""
-        if self.test_dir.exists():
-            shutil.rmtree(self.test_dir)
-        print("🗑️  Test cleanup complete")
-    
     def create_test_file(self, filename: str, content: str, metadata: Dict[str, Any] = None) -> Path:
         """Create a test file with optional metadata."""
         filepath = self.watch_folder / filename
         
         # Write content file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        filepath.write_bytes(content.encode('utf-8'))
         
         # Write metadata file if provided
         if metadata:
             meta_file = filepath.with_suffix(filepath.suffix + '.meta.json')
-            with open(meta_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2)
+            meta_file.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
         
         return filepath
     
@@ -142,6 +153,28 @@ class TestFileWatcher(unittest.TestCase):
         self.assertNotEqual(original_hash, modified_hash)
         print("   ✅ File hash changes detected correctly")
     
+    def test_legacy_md5_hash_upgrade(self):
+        """Test that files logged with an MD5 digest are not processed again."""
+        print("\n🔁 Testing legacy MD5 log entries...")
+        
+        test_file = self.create_test_file("legacy.md", "Content logged by an older watcher")
+        legacy_hash = hashlib.md5(test_file.read_bytes()).hexdigest()
+        self.processed_log.write_bytes(orjson.dumps({'legacy.md': {'hash': legacy_hash, 'chunks': 1}}))
+        
+        handler = MemoryFileHandler(str(self.watch_folder), str(self.processed_log))
+        self.assertFalse(handler.should_process_file(test_file))
+        
+        # The record now carries the current digest and stat
+        record = handler.processed_files['legacy.md']
+        self.assertEqual(record['hash'], handler.get_file_hash(test_file))
+        self.assertEqual(record['size'], test_file.stat().st_size)
+        
+        # A real edit is still detected
+        test_file.write_bytes(b"Edited content")
+        self.assertTrue(handler.should_process_file(test_file))
+        
+        print("   ✅ Legacy MD5 entry recognised and upgraded")
+    
     @patch('watch_and_load.BatchMemoryLoader')
     async def test_file_processing_async(self, mock_loader_class):
         """Test asynchronous file processing."""
@@ -150,10 +183,9 @@ class TestFileWatcher(unittest.TestCase):
         # Mock the loader
         mock_loader = AsyncMock()
 
-        # Mock the process_file method to set successful_inserts after processing
+        # Mock the process_file method to return this file's chunk counts
         async def mock_process_file(*args, **kwargs):
-            mock_loader.successful_inserts = 2
-            mock_loader.failed_inserts = 0
+            return {'total': 2, 'successful': 2, 'failed': 0, 'skipped': 0}
 
         mock_loader.process_file.side_effect = mock_process_file
         mock_loader_class.return_value = mock_loader
@@ -219,12 +251,12 @@ class TestFileWatcher(unittest.TestCase):
         print("   ✅ Processed log persistence working correctly")
 
 
-class TestWatcherIntegration(unittest.TestCase):
+class TestWatcherIntegration(ScratchDirTestCase):
     """Integration tests for the complete watcher system."""
     
     def setUp(self):
         """Set up integration test environment."""
-        self.test_dir = Path(tempfile.mkdtemp())
+        self.test_dir = Path(tempfile.mkdtemp(dir=self.class_dir))
         self.watch_folder = self.test_dir / "integration-test-drops"
         self.processed_log = self.test_dir / "integration_processed.json"
         
@@ -234,12 +266,6 @@ class TestWatcherIntegration(unittest.TestCase):
         print(f"🔧 Integration test setup complete")
         print(f"   Watch folder: {self.watch_folder}")
     
-    def tearDown(self):
-        """Clean up integration test environment."""
-        if self.test_dir.exists():
-            shutil.rmtree(self.test_dir)
-        print("🗑️  Integration test cleanup complete")
-    
     @patch('watch_and_load.BatchMemoryLoader')
     async def test_existing_files_processing(self, mock_loader_class):
         """Test processing of existing files on startup."""
@@ -247,8 +273,9 @@ class TestWatcherIntegration(unittest.TestCase):
 
         # Mock the loader
         mock_loader = AsyncMock()
-        mock_loader.successful_inserts = 1
-        mock_loader.failed_inserts = 0
+        mock_loader.process_file.return_value = {
+            'total': 1, 'successful': 1, 'failed': 0, 'skipped': 0
+        }
         mock_loader_class.return_value = mock_loader
 
         # Create some existing files
@@ -259,9 +286,7 @@ class TestWatcherIntegration(unittest.TestCase):
         ]
 
         for filename, content in existing_files:
-            filepath = self.watch_folder / filename
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+            (self.watch_folder / filename).write_bytes(content.encode('utf-8'))
 
         # Create watcher
         watcher = MemoryWatcher(str(self.watch_folder), str(self.processed_log))
@@ -277,38 +302,12 @@ class TestWatcherIntegration(unittest.TestCase):
         print(f"   ✅ Processed {len(existing_files)} existing files")
 
 
-async def run_async_tests():
-    """Run async test methods."""
-    print("🚀 Running async tests...")
-    
-    # File processing tests
-    test_case = TestFileWatcher()
-    test_case.setUp()
-    
-    try:
-        await test_case.test_file_processing_async()
-    finally:
-        test_case.tearDown()
-    
-    # Integration tests
-    integration_test = TestWatcherIntegration()
-    integration_test.setUp()
-    
-    try:
-        await integration_test.test_existing_files_processing()
-    finally:
-        integration_test.tearDown()
-
-
 def main():
     """Run all tests."""
     print("🧪 Starting File Watcher Test Suite")
     print("=" * 60)
     
-    # Run synchronous tests
-    print("\n📋 Running synchronous tests...")
-    
-    # Create test suite
+    # Create test suite; the async tests run on their own event loop per test
     suite = unittest.TestSuite()
     
     # Add test cases
@@ -316,16 +315,15 @@ def main():
     suite.addTest(TestFileWatcher('test_should_process_file'))
     suite.addTest(TestFileWatcher('test_metadata_loading'))
     suite.addTest(TestFileWatcher('test_file_hash_detection'))
+    suite.addTest(TestFileWatcher('test_legacy_md5_hash_upgrade'))
+    suite.addTest(TestFileWatcher('test_file_processing_async'))
     suite.addTest(TestFileWatcher('test_processed_log_persistence'))
+    suite.addTest(TestWatcherIntegration('test_existing_files_processing'))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=0)
     result = runner.run(suite)
     
-    # Run async tests
-    print("\n⚡ Running async tests...")
-    asyncio.run(run_async_tests())
-    
     # Summary
     print("\n" + "=" * 60)
     if result.wasSuccessful():
@@ -1,19 +1,147 @@
 """Utility functions for the AI memory system."""
 
-from typing import List
+import asyncio
+import hashlib
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
 from openai import AsyncOpenAI
 from config import config
 
+# The embedding column is halfvec (fp16, ~3.3 significant digits); six digits leave
+# practically every component on the same fp16 value after the server-side cast
+HALFVEC_SIGNIFICANT_DIGITS = 6
+# How long get_embedding waits for other callers before sending a batched request
+EMBED_BATCH_WINDOW = 0.005
+MAX_EMBED_BATCH = 64
+# Recent texts whose embeddings get_embedding returns without another request
+EMBEDDING_CACHE_SIZE = 1024
+# rerank_memories score: similarity dominates; importance (1-5) and recency break near-ties
+SIMILARITY_WEIGHT = 0.8
+IMPORTANCE_WEIGHT = 0.1
+RECENCY_WEIGHT = 0.1
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into batched API calls."""
+
+    def __init__(self, client: AsyncOpenAI) -> None:
+        self.client = client
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_task = None
+        # Digest of (model, dimensions, text) -> embedding, least recently used first.
+        # Stored as tuples so callers can't mutate a cached vector
+        self._cache: Dict[bytes, Tuple[float, ...]] = {}
+
+    async def embed(self, text: str) -> List[float]:
+        """Return a cached embedding, or queue text for the next batch and wait for it."""
+        key = hashlib.blake2b(
+            f"{config.embedding_model}\0{config.embedding_dimensions}\0{text}".encode('utf-8'),
+            digest_size=16
+        ).digest()
+        embedding = self._cache.pop(key, None)
+        if embedding is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending.append((text, future))
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+            embedding = tuple(await future)
+        self._cache[key] = embedding
+        if len(self._cache) > EMBEDDING_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        return list(embedding)
+
+    async def _flush(self) -> None:
+        """Wait for the batch window, then embed everything queued so far."""
+        try:
+            await asyncio.sleep(EMBED_BATCH_WINDOW)
+        finally:
+            # Texts queued from now on start the next batch
+            self._flush_task = None
+        pending, self._pending = self._pending, []
+        await asyncio.gather(*(
+            self._send(pending[i:i + MAX_EMBED_BATCH])
+            for i in range(0, len(pending), MAX_EMBED_BATCH)
+        ))
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve its callers' futures."""
+        try:
+            embeddings = await get_embeddings([text for text, _ in batch], self.client)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+# One batcher per client, so callers sharing a client share batches
+_batchers: "weakref.WeakKeyDictionary[AsyncOpenAI, EmbeddingBatcher]" = weakref.WeakKeyDictionary()
+
+
 async def get_embedding(text: str, client: AsyncOpenAI) -> List[float]:
-    """Generate embedding for a given text."""
-    text = text.strip()
-    try:
-        response = await client.embeddings.create(
-            model=config.embedding_model,
-            input=[text],
-            encoding_format="float",
-            dimensions=config.embedding_dimensions
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        raise RuntimeError(f"Failed to get embedding: {e}")
\ No newline at end of file
+    """Generate embedding for a given text (callers strip it once, up front).
+
+    Calls made concurrently on the same client are sent as one batched request.
+    """
+    batcher = _batchers.get(client)
+    if batcher is None:
+        batcher = _batchers[client] = EmbeddingBatcher(client)
+    return await batcher.embed(text)
+
+
+async def get_embeddings(texts: Sequence[str], client: AsyncOpenAI) -> List[List[float]]:
+    """Generate embeddings for several texts in one request, in input order.
+
+    Texts are sent as given, so strip them when they are read in; API errors propagate.
+    """
+    response = await client.embeddings.create(
+        model=config.embedding_model,
+        input=list(texts),
+        encoding_format="float",
+        dimensions=config.embedding_dimensions
+    )
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def halfvec_param(embedding: Sequence[float]) -> List[float]:
+    """Round a query embedding to halfvec precision to shrink the RPC JSON payload."""
+    return [float(f"{x:.{HALFVEC_SIGNIFICANT_DIGITS}g}") for x in embedding]
+
+
+def rerank_memories(memories: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Order match_memories candidates by similarity blended with importance and recency.
+
+    Callers fetch more candidates than they need; the best `limit` rows are returned.
+    """
+    if not memories:
+        return []
+
+    similarity = np.array([m.get('similarity') or 0.0 for m in memories], dtype=np.float64)
+    importance = np.array([m.get('importance') or 1 for m in memories], dtype=np.float64)
+
+    # Age in days; rows without a timestamp get no recency boost
+    now = datetime.now(timezone.utc)
+    age_days = np.full(len(memories), np.inf)
+    for i, memory in enumerate(memories):
+        try:
+            created = datetime.fromisoformat(memory['created_at'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        age_days[i] = max((now - created).total_seconds() / 86400, 0.0)
+    recency = 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    scores = (SIMILARITY_WEIGHT * similarity
+              + IMPORTANCE_WEIGHT * (importance - 1) / 4
+              + RECENCY_WEIGHT * recency)
+    # Stable sort keeps the server's similarity order for equal scores
+    order = np.argsort(-scores, kind='stable')[:limit]
+    return [memories[i] for i in order]